@@ -0,0 +1,55 @@
+import streamlit as st
+from datetime import timedelta
+from db import ConnectionPool, DB_PATH
+
+# Helpers shared by the dashboard's pages. This module stays light (no
+# pandas, plotly or folium) since every run imports it.
+
+# One connection pool per server process, shared by every session and rerun;
+# the schema is created when the pool is first built
+@st.cache_resource
+def get_pool():
+    return ConnectionPool(DB_PATH)
+
+# Rows shown per table page
+PAGE_SIZE = 50
+ALL_PATIENTS = "All patients"
+
+# Distinct patient names for the filter dropdown; refreshed once a minute
+@st.cache_data(ttl=60)
+def patient_names(_cursor, table, name_column):
+    _cursor.execute(f"SELECT DISTINCT {name_column} FROM {table} ORDER BY {name_column}")
+    return [row[0] for row in _cursor.fetchall()]
+
+# Patient and date-range filters shown above a table; returns the SQL WHERE
+# clause (matching the (name, timestamp) indexes) and its parameters
+def table_filters(cursor, key, table, name_column):
+    col1, col2 = st.columns(2)
+    with col1:
+        patient = st.selectbox("Patient", [ALL_PATIENTS] + patient_names(cursor, table, name_column),
+                               key=f"{key}_patient")
+    with col2:
+        dates = st.date_input("Date range", value=(), key=f"{key}_dates")
+
+    conditions, params = [], []
+    if patient != ALL_PATIENTS:
+        conditions.append(f"{name_column} = ?")
+        params.append(patient)
+    if dates:
+        conditions.append("timestamp >= ? AND timestamp < ?")
+        params += [dates[0].isoformat(), (dates[-1] + timedelta(days=1)).isoformat()]
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+# Fetch one page of a query, newest first. One extra row is fetched to tell
+# whether a next page exists, so no full-table COUNT is needed.
+def fetch_page(cursor, key, query, params):
+    page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+    cursor.execute(f"{query} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                   params + [PAGE_SIZE + 1, (page - 1) * PAGE_SIZE])
+    records = cursor.fetchall()
+    if len(records) > PAGE_SIZE:
+        st.caption(f"Page {page} - more on the next page")
+    elif page > 1:
+        st.caption(f"Page {page} - last page")
+    return records[:PAGE_SIZE]
@@ -0,0 +1,42 @@
+import streamlit as st
+import pandas as pd
+from app_pages.common import fetch_page
+
+# Submit emergency contact to the database
+def submit_contact(name, relationship, phone, conn, cursor):
+    cursor.execute("""
+        INSERT INTO emergency_contacts (name, relationship, phone)
+        VALUES (?, ?, ?)
+    """, (name, relationship, phone))
+    conn.commit()
+    st.success("Emergency contact added successfully!")
+
+# View one page of emergency contacts as a dataframe
+def view_contacts(cursor):
+    records = fetch_page(cursor, "emergency_contacts", """
+        SELECT id, name, relationship, phone, timestamp FROM emergency_contacts
+    """, [])
+    if records:
+        df = pd.DataFrame(records, columns=["ID", "Name", "Relationship", "Phone", "Timestamp"])
+        st.dataframe(df)
+    else:
+        st.warning("No emergency contacts found.")
+
+# Emergency Contacts page
+def render(conn, cursor):
+    st.title("Emergency Contacts")
+
+    # Input form for emergency contact
+    contact_name = st.text_input("Contact Name")
+    relationship = st.text_input("Relationship")
+    phone = st.text_input("Phone Number")
+
+    if st.button("Add Emergency Contact"):
+        if contact_name and relationship and phone:
+            submit_contact(contact_name, relationship, phone, conn, cursor)
+        else:
+            st.error("Please fill in all fields.")
+
+    # Display emergency contacts
+    st.write("### Emergency Contacts List")
+    view_contacts(cursor)
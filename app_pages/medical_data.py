@@ -0,0 +1,132 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import timedelta
+from app_pages.common import ALL_PATIENTS, fetch_page, table_filters
+from ingest import ingest, validate_reading
+from vitals_series import VitalsSeries, chart_resolution, downsample, rollup
+
+# Most points sent to the browser per chart, about two per horizontal pixel
+CHART_POINTS = 1400
+# Most vitals ranges kept in memory at once, and seconds before one is
+# dropped and loaded again
+SERIES_CACHE_ENTRIES = 32
+SERIES_CACHE_TTL = 15 * 60
+
+# Function to validate input fields
+def validate_inputs(name, age, bp, hr):
+    error = validate_reading(name, age, bp, hr)
+    if error:
+        st.error(error)
+        return False
+    return True
+
+# Submit data to the database, along with a notification for every alert
+# rule the reading breaks
+def submit_data(name, age, bp, hr, conn):
+    _, notifications, _ = ingest(conn, [{"name": name, "age": age, "blood_pressure": bp, "heart_rate": hr}])
+    for _, abnormal_data, abnormal_type, _ in notifications:
+        st.success(f"Notification created for abnormal {abnormal_type}: {abnormal_data}")
+
+    st.success("Data submitted successfully!")
+
+# View one page of submitted data as a dataframe
+def view_data(cursor):
+    where, params = table_filters(cursor, "medical_data", "medical_data", "name")
+    records = fetch_page(cursor, "medical_data", f"""
+        SELECT id, name, age, blood_pressure, systolic, diastolic, heart_rate, timestamp FROM medical_data{where}
+    """, params)
+    if records:
+        df = pd.DataFrame(records, columns=["ID", "Name", "Age", "Blood Pressure", "Systolic", "Diastolic",
+                                            "Heart Rate", "Timestamp"])
+        st.dataframe(df)
+        return df
+    else:
+        st.warning("No data found.")
+        return pd.DataFrame()
+
+# One shared, incrementally refreshed vitals history per patient and range
+@st.cache_resource(max_entries=SERIES_CACHE_ENTRIES, ttl=SERIES_CACHE_TTL)
+def vitals_series(name, start, end):
+    return VitalsSeries(name, start, end)
+
+# Plot heart rate and blood pressure for the patient and dates picked in the
+# Medical Data filters. Short ranges are drawn from the raw readings,
+# downsampled to what the chart can actually show; longer ones from the
+# hourly or daily rollups.
+def plot_data(cursor):
+    patient = st.session_state.get("medical_data_patient", ALL_PATIENTS)
+    if patient == ALL_PATIENTS:
+        st.info("Select a patient above to plot their vitals.")
+        return
+    dates = st.session_state.get("medical_data_dates", ())
+    start, end = (dates[0], dates[-1] + timedelta(days=1)) if dates else (None, None)
+    resolution = chart_resolution(cursor, patient, start, end)
+    if resolution != "raw":
+        plot_rollup(rollup(cursor, patient, resolution, start, end), resolution)
+        return
+    df = vitals_series(patient, start, end).refresh(cursor)
+    if not df.empty:
+        # Markers only help when there are few enough points to tell apart
+        markers = len(df) <= 200
+
+        # Plot heart rate
+        df_hr = downsample(df, ['Heart Rate'], CHART_POINTS)
+        fig_hr = px.line(df_hr, x='Timestamp', y='Heart Rate', title='Heart Rate Over Time', markers=markers)
+        st.plotly_chart(fig_hr)
+
+        # Plot blood pressure
+        df_bp = downsample(df, ['Systolic', 'Diastolic'], CHART_POINTS)
+        fig_bp = px.line(df_bp, x='Timestamp', y=['Systolic', 'Diastolic'],
+                         title='Blood Pressure Over Time', markers=markers)
+        st.plotly_chart(fig_bp)
+        if len(df_hr) < len(df) or len(df_bp) < len(df):
+            st.caption(f"{len(df)} readings, downsampled to their highs and lows for display")
+
+# Plot hourly or daily rollups: each metric's mean as a line over a shaded
+# band from its minimum to its maximum
+def plot_rollup(df, resolution):
+    if df.empty:
+        return
+    for title, metrics in [("Heart Rate", ["Heart Rate"]), ("Blood Pressure", ["Systolic", "Diastolic"])]:
+        fig = go.Figure()
+        for metric, color in zip(metrics, px.colors.qualitative.Plotly):
+            fig.add_trace(go.Scatter(x=df["Timestamp"], y=df[f"{metric} Max"], line=dict(width=0, color=color),
+                                     showlegend=False, hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=df["Timestamp"], y=df[f"{metric} Min"], line=dict(width=0, color=color),
+                                     fill="tonexty", name=f"{metric} range", hoverinfo="skip"))
+            fig.add_trace(go.Scatter(x=df["Timestamp"], y=df[f"{metric} Mean"], line=dict(color=color),
+                                     name=f"{metric} ({resolution} mean)"))
+        fig.update_layout(title=f"{title} Over Time")
+        st.plotly_chart(fig)
+    st.caption(f"{int(df['Readings'].sum())} readings, shown as {len(df)} {resolution} summaries")
+
+# Medical Data page
+def render(conn, cursor):
+    st.title("Senior Safe - Medical Data")
+
+    # Use columns for neater input layout
+    col1, col2 = st.columns(2)
+
+    with col1:
+        name = st.text_input("Patient Name")
+        age = st.text_input("Age")
+
+    with col2:
+        bp = st.text_input("Blood Pressure (mmHg)", placeholder="e.g., 120/80")
+        hr = st.text_input("Heart Rate (bpm)")
+
+    # Submit button
+    if st.button("Submit"):
+        if validate_inputs(name, age, bp, hr):
+            submit_data(name, age, bp, hr, conn)
+
+    # Display submitted data
+    st.write("### Submitted Medical Data")
+    df = view_data(cursor)
+
+    # Plot heart rate and blood pressure with abnormal data highlighted
+    if not df.empty:
+        st.write("### Visualizations")
+        plot_data(cursor)
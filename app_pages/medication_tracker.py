@@ -0,0 +1,120 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from app_pages.common import ALL_PATIENTS, fetch_page, table_filters
+from medications import DOSE_UNITS, adherence_report, daily_totals, doses_due, log_dose, parse_dose_times, set_schedule
+
+# Days the adherence report covers until another range is picked
+ADHERENCE_DAYS = 7
+
+# View one page of medications as a dataframe
+def view_medications(cursor):
+    where, params = table_filters(cursor, "medications", "medications", "patient_name")
+    records = fetch_page(cursor, "medications", f"""
+        SELECT id, patient_name, medication_name, dose_amount, dose_unit, dosage, timestamp FROM medications{where}
+    """, params)
+    if records:
+        df = pd.DataFrame(records, columns=["ID", "Patient Name", "Medication Name", "Amount", "Unit", "Dosage",
+                                            "Timestamp"])
+        st.dataframe(df)
+        return df
+    else:
+        st.warning("No medications logged.")
+        return pd.DataFrame()
+
+# Form to set, change or stop a patient's medication schedule
+def schedule_form(conn):
+    with st.expander("Set medication schedule"):
+        name = st.text_input("Patient Name", key="schedule_patient")
+        med_name = st.text_input("Medication Name", key="schedule_medication")
+        times = st.text_input("Dose times (UTC)", placeholder="e.g., 08:00, 20:00", key="schedule_times",
+                              help="Leave empty to stop scheduling this medication from the start date")
+        col1, col2 = st.columns(2)
+        with col1:
+            amount = st.number_input("Dose", min_value=0.0, value=1.0, key="schedule_amount")
+            start = st.date_input("Starting", value=datetime.now(timezone.utc).date(), key="schedule_start")
+            window = st.number_input("On time within (minutes)", min_value=0, value=60, key="schedule_window")
+        with col2:
+            unit = st.selectbox("Unit", DOSE_UNITS, key="schedule_unit")
+            end = st.date_input("Until (optional)", value=None, key="schedule_end")
+            late = st.number_input("Late up to (minutes)", min_value=0, value=240, key="schedule_late")
+
+        if st.button("Save Schedule"):
+            try:
+                dose_times = parse_dose_times(times)
+            except ValueError:
+                st.error("Please enter dose times as HH:MM, separated by commas (e.g., 08:00, 20:00).")
+                return
+            if not name or not med_name:
+                st.error("Patient and medication names are required.")
+            elif end is not None and end < start:
+                st.error("The schedule can't end before it starts.")
+            else:
+                set_schedule(conn, name, med_name, dose_times, amount, unit, start, end, window, late)
+                if dose_times:
+                    st.success(f"{med_name} scheduled for {name} at {', '.join(dose_times)} from {start}.")
+                else:
+                    st.success(f"{med_name} is no longer scheduled for {name} from {start}.")
+
+# Adherence of every scheduled patient over the picked range, and the
+# missed and late doses and daily totals of the patient picked in the
+# Medication History filters
+def adherence_section(cursor):
+    today = datetime.now(timezone.utc).date()
+    dates = st.date_input("Report range", value=(today - timedelta(days=ADHERENCE_DAYS - 1), today),
+                          key="adherence_dates")
+    if not dates:
+        return
+    start, end = dates[0], dates[-1] + timedelta(days=1)
+    report = adherence_report(cursor, start, end)
+    if report.empty:
+        st.info("No scheduled doses in this range. Set a schedule above to track adherence.")
+    else:
+        st.dataframe(report, hide_index=True)
+
+    patient = st.session_state.get("medications_patient", ALL_PATIENTS)
+    if patient == ALL_PATIENTS:
+        st.caption("Pick a patient in the history filters to see their missed and late doses.")
+        return
+    doses = doses_due(cursor, start, end, patient)
+    st.write(f"#### Missed and late doses for {patient}")
+    problems = doses[doses["Status"].isin(["missed", "late"])]
+    if problems.empty:
+        st.success("No missed or late doses in this range.")
+    else:
+        st.dataframe(problems, hide_index=True)
+    st.write(f"#### Daily totals for {patient}")
+    totals = daily_totals(cursor, patient, start, end)
+    if totals.empty:
+        st.info("No doses logged in this range.")
+    else:
+        st.dataframe(totals, hide_index=True)
+
+# Medication Tracker page
+def render(conn, cursor):
+    st.title("Medication Tracker")
+
+    # Input form for medication logging
+    name = st.text_input("Patient Name")
+    med_name = st.text_input("Medication Name")
+    col1, col2 = st.columns(2)
+    with col1:
+        amount = st.number_input("Dose", min_value=0.0, value=None, placeholder="e.g., 500")
+    with col2:
+        unit = st.selectbox("Unit", DOSE_UNITS)
+
+    if st.button("Log Medication"):
+        if name and med_name and amount:
+            log_dose(conn, name, med_name, amount, unit)
+            st.success(f"{med_name} logged for {name} successfully!")
+        else:
+            st.error("Please fill in all fields.")
+
+    schedule_form(conn)
+
+    # Display medication history
+    st.write("### Medication History")
+    df_med = view_medications(cursor)
+
+    st.write("### Adherence")
+    adherence_section(cursor)
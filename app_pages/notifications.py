@@ -0,0 +1,111 @@
+import streamlit as st
+import pandas as pd
+import folium
+from app_pages.common import ALL_PATIENTS, fetch_page, get_pool, table_filters
+from hospitals import HospitalIndex
+
+# How often the live notifications feed polls, and how many rows it shows
+LIVE_REFRESH_SECONDS = 3
+LIVE_FEED_SIZE = 200
+NOTIFICATION_COLUMNS = ["ID", "Type", "Patient", "Details", "Timestamp"]
+# Shown on the map for patients without a saved location
+DEFAULT_LOCATION = (35.797103, -78.85597)
+
+# Notifications page
+def render(conn, cursor):
+    st.write("### Notifications")
+    live_notifications()
+
+    # One page of older notifications, with filters
+    st.write("#### History")
+    where, params = table_filters(cursor, "notifications", "notifications", "name")
+    notifications = fetch_page(cursor, "notifications", f"""
+        SELECT id, abnormal_type, name, abnormal_data, timestamp FROM notifications{where}
+    """, params)
+
+    if notifications:
+        st.dataframe(pd.DataFrame(notifications, columns=NOTIFICATION_COLUMNS), hide_index=True)
+    else:
+        st.info("No notifications available.")
+
+    # Route from the filtered patient's location to their nearest hospital
+    st.write("### Nearby Hospital Route")
+    patient = st.session_state.get("notifications_patient", ALL_PATIENTS)
+    location = None
+    if patient != ALL_PATIENTS:
+        cursor.execute("SELECT latitude, longitude FROM patient_locations WHERE name = ?", (patient,))
+        location = cursor.fetchone()
+        if location is None:
+            st.caption(f"No saved location for {patient}; showing the default location.")
+    location = tuple(location or DEFAULT_LOCATION)
+    hospital, hospital_lat, hospital_lon, distance = hospital_index().nearest(*location)
+    st.caption(f"Nearest hospital: {hospital}, {distance:.1f} km away")
+    st.iframe(map_html(location, (hospital_lat, hospital_lon)), height=500)
+
+    with st.expander("Set patient location"):
+        location_name = st.text_input("Patient Name", value="" if patient == ALL_PATIENTS else patient)
+        latitude = st.number_input("Latitude", min_value=-90.0, max_value=90.0, value=location[0], format="%.6f")
+        longitude = st.number_input("Longitude", min_value=-180.0, max_value=180.0, value=location[1], format="%.6f")
+        if st.button("Save Location"):
+            if not location_name:
+                st.error("Patient name is required.")
+            else:
+                save_location(location_name, latitude, longitude, conn, cursor)
+
+# Remember where a patient is
+def save_location(name, latitude, longitude, conn, cursor):
+    cursor.execute("""
+        INSERT INTO patient_locations (name, latitude, longitude) VALUES (?, ?, ?)
+        ON CONFLICT (name) DO UPDATE SET latitude = excluded.latitude, longitude = excluded.longitude,
+                                         timestamp = CURRENT_TIMESTAMP
+    """, (name, latitude, longitude))
+    conn.commit()
+    st.success(f"Location saved for {name}.")
+
+# Hospital locations from hospitals.csv, loaded once per server process
+@st.cache_resource
+def hospital_index():
+    return HospitalIndex.from_csv()
+
+# Map of a route from a location to a hospital, rendered to HTML once per
+# (location, hospital) pair
+@st.cache_data(max_entries=256)
+def map_html(location, hospital):
+    map_ = folium.Map(location=location, zoom_start=13)
+
+    # Add markers for the patient's location and the hospital
+    folium.Marker(location, tooltip="Patient Location", icon=folium.Icon(color="blue")).add_to(map_)
+    folium.Marker(hospital, tooltip="Nearest Hospital", icon=folium.Icon(color="red")).add_to(map_)
+
+    # Draw route (straight line)
+    folium.PolyLine(locations=[location, hospital], color="green", weight=2.5).add_to(map_)
+    map_.fit_bounds([location, hospital], padding=(30, 30))
+    return map_.get_root().render()
+
+# The newest notifications, refreshed on a timer without rerunning the rest
+# of the page. Each refresh only fetches rows with an id above the last one
+# seen and keeps the latest LIVE_FEED_SIZE in the session.
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_notifications():
+    feed = st.session_state.get("live_notifications")
+    last_id = 0 if feed is None or feed.empty else int(feed["ID"].iloc[0])
+    with get_pool().connection() as conn:
+        records = conn.execute("""
+            SELECT id, abnormal_type, name, abnormal_data, timestamp FROM notifications
+            WHERE id > ? ORDER BY id DESC LIMIT ?
+        """, (last_id, LIVE_FEED_SIZE)).fetchall()
+
+    new = pd.DataFrame(records, columns=NOTIFICATION_COLUMNS)
+    if feed is None:
+        feed = new
+    elif not new.empty:
+        for row in new.head(3).itertuples(index=False):
+            st.toast(f"**{row.Type}** - **{row.Patient}** ({row.Details})")
+        feed = pd.concat([new, feed], ignore_index=True).head(LIVE_FEED_SIZE)
+    st.session_state["live_notifications"] = feed
+
+    st.write("#### Live feed")
+    if feed.empty:
+        st.info("No notifications yet.")
+    else:
+        st.dataframe(feed, hide_index=True)
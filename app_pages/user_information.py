@@ -0,0 +1,37 @@
+import streamlit as st
+
+# User Information page
+def render(conn, cursor):
+    st.title("User Information Form")  # Updated title
+
+    # Form inputs
+    name = st.text_input("Name")
+    age = st.text_input("Age")
+    birthdate = st.date_input("Birthdate")  # Input for birthdate
+    phone = st.text_input("Phone Number")
+    email = st.text_input("Email")
+    medication = st.text_input("Medication")
+    allergies = st.text_input("Allergies")
+    chronic_conditions = st.text_area("Chronic Conditions")  # Input for chronic conditions
+    procedures = st.text_area("Medical Procedures")  # Input for medical procedures
+    insurance = st.text_input("Insurance Information")
+
+    # Submit button to handle user info submission
+    if st.button("Submit"):
+        if not name or not age or not phone or not email:
+            st.error("Please fill in all required fields (Name, Age, Phone, and Email).")
+        else:
+            st.success("User information submitted successfully!")
+
+    # Display the entered data back to the user
+    if name and age and phone and email:
+        st.write(f"**Name**: {name}")
+        st.write(f"**Age**: {age}")
+        st.write(f"**Birthdate**: {birthdate}")
+        st.write(f"**Phone**: {phone}")
+        st.write(f"**Email**: {email}")
+        st.write(f"**Medication**: {medication}")
+        st.write(f"**Allergies**: {allergies}")
+        st.write(f"**Chronic Conditions**: {chronic_conditions}")
+        st.write(f"**Medical Procedures**: {procedures}")
+        st.write(f"**Insurance Info**: {insurance}")
@@ -1,64 +1,178 @@
+import argparse
+import os
 import cv2
 import numpy as np
 
-# Load the pre-trained MobileNet SSD model and prototxt file
-model_path = "MobileNetSSD_deploy.caffemodel"
-config_path = "MobileNetSSD_deploy.prototxt"
-net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+# The pre-trained MobileNet SSD model and prototxt file, next to this script
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(MODEL_DIR, "MobileNetSSD_deploy.caffemodel")
+CONFIG_PATH = os.path.join(MODEL_DIR, "MobileNetSSD_deploy.prototxt")
 
 # List of class labels MobileNet SSD was trained to detect
-class_labels = ["background", "aeroplane", "bicycle", "bird", "boat", 
+class_labels = ["background", "aeroplane", "bicycle", "bird", "boat",
                 "bottle", "bus", "car", "cat", "chair", "cow", "diningtable",
-                "dog", "horse", "motorbike", "person", "pottedplant", 
+                "dog", "horse", "motorbike", "person", "pottedplant",
                 "sheep", "sofa", "train", "tvmonitor"]
+PERSON = class_labels.index("person")
 
-# Open webcam
-cap = cv2.VideoCapture(0)
-
-# Set webcam resolution (optional)
-cap.set(3, 640)  # Set width
-cap.set(4, 480)  # Set height
-
-while True:
-    # Capture frame-by-frame
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to capture frame")
-        break
-    
-    # Prepare the frame for object detection
-    h, w = frame.shape[:2]
-    blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
-
-    # Set the blob as input to the network
-    net.setInput(blob)
-    detections = net.forward()
-
-    # Loop over the detections
-    for i in range(detections.shape[2]):
-        # Extract the confidence (probability) for each detection
-        confidence = detections[0, 0, i, 2]
-
-        # Filter out weak detections with confidence less than 0.2
-        if confidence > 0.2:
-            # Get the class label index and the bounding box coordinates
-            class_id = int(detections[0, 0, i, 1])
-            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            (startX, startY, endX, endY) = box.astype("int")
-
-            # Draw the bounding box and label on the frame
-            label = f"{class_labels[class_id]}: {confidence:.2f}"
-            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
-            y = startY - 15 if startY - 15 > 15 else startY + 15
-            cv2.putText(frame, label, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-    # Display the frame with object detection
-    cv2.imshow("Object Detection", frame)
-
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close windows
-cap.release()
-cv2.destroyAllWindows()
+# Network input size; pixels are fed in as (value - MEAN) * SCALE
+INPUT_SIZE = 300
+SCALE = 0.007843
+MEAN = 127.5
+# Frames are tracked at this width between detections
+TRACK_WIDTH = 320
+
+
+# MobileNet SSD detector that can be reused frame after frame. The resized
+# frame and the input blob live in buffers allocated once, detections are
+# filtered with numpy instead of a Python loop, and with detect_every=N the
+# network only runs on every Nth frame: in between, boxes follow the image
+# content with sparse optical flow.
+class ObjectDetector:
+    def __init__(self, config_path=CONFIG_PATH, model_path=MODEL_PATH, confidence=0.2, classes=None,
+                 detect_every=1):
+        self.net = cv2.dnn.readNetFromCaffe(config_path, model_path)
+        self.confidence = confidence
+        self.classes = None if classes is None else np.asarray(classes)
+        self.detect_every = max(int(detect_every), 1)
+        self.boxes = np.empty((0, 4), dtype=np.int32)
+        self.class_ids = np.empty(0, dtype=np.int32)
+        self.confidences = np.empty(0, dtype=np.float32)
+        self._resized = np.empty((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        self._blob = np.empty((1, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        self._frames = 0
+        self._previous = None
+        self._track_scale = 1.0
+
+    # Same values as cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)),
+    # 0.007843, (300, 300), (127.5, 127.5, 127.5)), without allocating new
+    # arrays. (A bare 127.5 mean there only applies to the first channel.)
+    def _fill_blob(self, frame):
+        cv2.resize(frame, (INPUT_SIZE, INPUT_SIZE), dst=self._resized)
+        np.subtract(self._resized.transpose(2, 0, 1), MEAN, out=self._blob[0])
+        np.multiply(self._blob, SCALE, out=self._blob)
+        return self._blob
+
+    # Run the network on one frame. Returns boxes (N x 4 pixel x0, y0, x1, y1),
+    # class ids and confidences of the detections that pass the filters.
+    def detect(self, frame):
+        h, w = frame.shape[:2]
+        self.net.setInput(self._fill_blob(frame))
+        detections = self.net.forward()[0, 0]
+        keep = detections[:, 2] > self.confidence
+        if self.classes is not None:
+            keep &= np.isin(detections[:, 1].astype(np.int32), self.classes)
+        detections = detections[keep]
+        boxes = detections[:, 3:7] * np.array([w, h, w, h], dtype=np.float32)
+        boxes = np.clip(boxes, 0, [w - 1, h - 1, w - 1, h - 1]).astype(np.int32)
+        return boxes, detections[:, 1].astype(np.int32), detections[:, 2]
+
+    # Shift every box by the median optical flow of the corners inside it
+    def _track(self, gray):
+        previous, boxes = self._previous, self.boxes
+        if previous is None or previous.shape != gray.shape or not len(boxes):
+            return
+        scaled = (boxes * self._track_scale).astype(np.int32)
+        points, owners = [], []
+        for i, (x0, y0, x1, y1) in enumerate(scaled):
+            if x1 - x0 < 8 or y1 - y0 < 8:
+                continue
+            corners = cv2.goodFeaturesToTrack(previous[y0:y1, x0:x1], maxCorners=20, qualityLevel=0.01,
+                                              minDistance=4)
+            if corners is not None:
+                points.append(corners.reshape(-1, 2) + (x0, y0))
+                owners.append(np.full(len(corners), i))
+        if not points:
+            return
+        points = np.concatenate(points).astype(np.float32)
+        owners = np.concatenate(owners)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, gray, points.reshape(-1, 1, 2), None)
+        tracked = status.ravel() == 1
+        shifts = (moved.reshape(-1, 2) - points)[tracked] / self._track_scale
+        owners = owners[tracked]
+        h, w = gray.shape[0] / self._track_scale, gray.shape[1] / self._track_scale
+        for i in np.unique(owners):
+            dx, dy = np.median(shifts[owners == i], axis=0)
+            self.boxes[i] = np.clip(self.boxes[i] + np.array([dx, dy, dx, dy]), 0,
+                                    [w - 1, h - 1, w - 1, h - 1]).astype(np.int32)
+
+    # Detections for the next frame of a stream: from the network every
+    # detect_every frames, from tracking the last ones otherwise
+    def update(self, frame):
+        if self.detect_every > 1:
+            self._track_scale = min(TRACK_WIDTH / frame.shape[1], 1.0)
+            small = cv2.resize(frame, None, fx=self._track_scale, fy=self._track_scale,
+                               interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self._frames % self.detect_every == 0:
+            self.boxes, self.class_ids, self.confidences = self.detect(frame)
+        else:
+            self._track(gray)
+        self._frames += 1
+        if self.detect_every > 1:
+            self._previous = gray
+        return self.boxes, self.class_ids, self.confidences
+
+    # Region around the most confident person in the frame, grown by margin
+    # on every side, as (x0, y0, x1, y1); None if nobody is in view
+    def person_roi(self, frame, margin=0.15):
+        boxes, class_ids, confidences = self.update(frame)
+        people = np.flatnonzero(class_ids == PERSON)
+        if not len(people):
+            return None
+        x0, y0, x1, y1 = boxes[people[np.argmax(confidences[people])]]
+        h, w = frame.shape[:2]
+        dx, dy = int((x1 - x0) * margin), int((y1 - y0) * margin)
+        x0, y0, x1, y1 = max(x0 - dx, 0), max(y0 - dy, 0), min(x1 + dx, w), min(y1 + dy, h)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        return int(x0), int(y0), int(x1), int(y1)
+
+
+# Draw the bounding box and label of each detection on the frame
+def draw_detections(frame, boxes, class_ids, confidences):
+    for (startX, startY, endX, endY), class_id, confidence in zip(boxes, class_ids, confidences):
+        label = f"{class_labels[class_id]}: {confidence:.2f}"
+        cv2.rectangle(frame, (int(startX), int(startY)), (int(endX), int(endY)), (0, 255, 0), 2)
+        y = startY - 15 if startY - 15 > 15 else startY + 15
+        cv2.putText(frame, label, (int(startX), int(y)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show MobileNet SSD detections on a webcam feed")
+    parser.add_argument("--camera", type=int, default=0, help="Camera index")
+    parser.add_argument("--confidence", type=float, default=0.2, help="Weakest detection to show")
+    parser.add_argument("--every", type=int, default=1, help="Run the network every N frames, tracking in between")
+    args = parser.parse_args()
+    detector = ObjectDetector(confidence=args.confidence, detect_every=args.every)
+
+    # Open webcam
+    cap = cv2.VideoCapture(args.camera)
+
+    # Set webcam resolution (optional)
+    cap.set(3, 640)  # Set width
+    cap.set(4, 480)  # Set height
+
+    while True:
+        # Capture frame-by-frame
+        ret, frame = cap.read()
+        if not ret:
+            print("Failed to capture frame")
+            break
+
+        draw_detections(frame, *detector.update(frame))
+
+        # Display the frame with object detection
+        cv2.imshow("Object Detection", frame)
+
+        # Break the loop if 'q' is pressed
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close windows
+    cap.release()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+import cv2
+import numpy as np
+from server import AdaptiveEncoder, CameraFeed, sendCameraStream
+from sources import ReplaySource, SyntheticSource, read_recording, write_recording
+
+# End-to-end benchmark of the vision pipeline on a headless box: recorded or
+# synthetic frames are replayed through server.py's feeds and wire protocol
+# into client.py's VisionService, and each stage's throughput and latency
+# are written out as JSON. Server and client share a process and a clock, so
+# end_to_end runs from the moment a frame is captured, through sending,
+# socket queueing and every client stage, to its classification.
+
+
+# "640x480" -> (640, 480)
+def parse_resolution(value):
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+# Encode up to `frames` frames of a video file, or of the synthetic pattern,
+# into JPEG payloads at the given resolution
+def encode_clip(source, resolution, frames, quality=80):
+    width, height = resolution
+    capture = SyntheticSource(width, height, fps=0) if source == "synthetic" else cv2.VideoCapture(source)
+    encoder = AdaptiveEncoder(quality=quality)
+    payloads = []
+    try:
+        while len(payloads) < frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            if (frame.shape[1], frame.shape[0]) != (width, height):
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            payloads.append(encoder.encode(frame).tobytes())
+    finally:
+        capture.release()
+    if not payloads:
+        raise SystemExit(f"No frames could be read from {source}")
+    return payloads
+
+
+# ReplaySource that notes when each frame is captured, keyed by the CRC of
+# its payload, so the client can look up when a frame it receives left the
+# camera without anything extra going over the wire. A looping clip repeats
+# payloads, so only the latest capture of each is kept; that is the frame
+# the client is getting unless it runs a whole clip behind.
+class StampedReplaySource(ReplaySource):
+    def __init__(self, payloads, fps=30, loop=False):
+        super().__init__(payloads, fps=fps, loop=loop)
+        self._crcs = [zlib.crc32(payload) for payload in payloads]
+        self.captured_at = {}
+
+    def retrieve(self):
+        ret, payload = super().retrieve()
+        self.captured_at[self._crcs[self.index % len(self.payloads)]] = time.monotonic()
+        return ret, payload
+
+    # origin callback for VisionService
+    def origin(self, data):
+        return self.captured_at.get(zlib.crc32(data))
+
+
+# server.py's feeds for a set of sources, served from an event loop on a
+# background thread, one port each
+class ReplayServer:
+    def __init__(self, sources, credits=4):
+        self.sources = sources
+        self.credits = credits
+        self.ports = []
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(ready),), name="replay-server",
+                                        daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self.ports
+
+    async def _serve(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        feeds, servers = [], []
+        try:
+            for index, source in enumerate(self.sources):
+                feed = CameraFeed(f"Camera {index}", source, AdaptiveEncoder(), credits=self.credits)
+                feed.start(self._loop)
+                feeds.append(feed)
+                server = await asyncio.start_server(
+                    lambda reader, writer, feed=feed: sendCameraStream(feed, reader, writer), "127.0.0.1", 0)
+                servers.append(server)
+                self.ports.append(server.sockets[0].getsockname()[1])
+            ready.set()
+            await self._stopped.wait()
+        finally:
+            ready.set()
+            for feed in feeds:
+                feed.stop()
+            for server in servers:
+                server.close()
+            # Keep the loop up until every capture thread has signalled it
+            await asyncio.wait_for(asyncio.gather(*(feed.done.wait() for feed in feeds)), timeout=5)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join(timeout=5)
+
+
+# Replay payloads to `cameras` connections at `fps` each and measure the
+# client for `duration` seconds after `warmup` seconds
+def run_case(client, payloads, cameras, fps, duration, warmup, args):
+    sources = [StampedReplaySource(payloads, fps=fps, loop=True) for _ in range(cameras)]
+    server = ReplayServer(sources, credits=args.credits)
+    ports = server.start()
+    try:
+        with client.VisionService([(("127.0.0.1", port), None) for port in ports], workers=args.workers,
+                                  motion_threshold=args.motion_threshold, processes=args.processes,
+                                  origin=lambda stream_id, data: sources[stream_id].origin(data)) as service:
+            service.start()
+            time.sleep(warmup)
+            service.metrics.reset()
+            time.sleep(duration)
+            snapshot = service.metrics.snapshot()
+    finally:
+        server.stop()
+    return snapshot
+
+
+def run(args):
+    # Imported here so recording works without MediaPipe installed
+    import client
+
+    if args.source.startswith("replay:"):
+        recording = read_recording(args.source[len("replay:"):])
+        first = cv2.imdecode(np.frombuffer(recording[0], dtype=np.uint8), cv2.IMREAD_COLOR)
+        clips = {(first.shape[1], first.shape[0]): recording}
+    else:
+        clips = {resolution: encode_clip(args.source, resolution, args.frames, args.quality)
+                 for resolution in args.resolution}
+
+    results = []
+    for (resolution, payloads), fps, cameras in itertools.product(clips.items(), args.fps, args.cameras):
+        snapshot = run_case(client, payloads, cameras, fps, args.duration, args.warmup, args)
+        stages = snapshot["stages"]
+        end_to_end = stages.get("end_to_end", {})
+        result = {
+            "resolution": f"{resolution[0]}x{resolution[1]}",
+            "fps": fps,
+            "cameras": cameras,
+            "offered_fps": fps * cameras,
+            "processed_fps": end_to_end.get("per_second", 0.0),
+            "mean_jpeg_bytes": sum(map(len, payloads)) / len(payloads),
+            "elapsed_s": snapshot["elapsed_s"],
+            "stages": stages,
+            "counters": snapshot["counters"],
+        }
+        results.append(result)
+        print(f"{result['resolution']} {fps:g} fps x {cameras}: {result['processed_fps']:.1f} of "
+              f"{result['offered_fps']:g} frames/s processed, end-to-end p50 {end_to_end.get('p50_ms', 0):.1f} ms "
+              f"p95 {end_to_end.get('p95_ms', 0):.1f} ms p99 {end_to_end.get('p99_ms', 0):.1f} ms")
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "settings": {
+            "source": args.source,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers,
+            "processes": args.processes,
+            "credits": args.credits,
+            "motion_threshold": args.motion_threshold,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def record(args):
+    payloads = encode_clip(args.source, args.resolution, args.frames, args.quality)
+    write_recording(args.output, payloads)
+    print(f"Recorded {len(payloads)} frames ({sum(map(len, payloads))} bytes) to {args.output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the vision pipeline with replayed camera streams")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("run", help="Replay frames into the client and report per-stage timings")
+    bench.add_argument("--source", default="synthetic",
+                       help="synthetic, a video file, or replay:RECORDING (default: synthetic)")
+    bench.add_argument("--resolution", action="append", type=parse_resolution,
+                       help="WIDTHxHEIGHT to test; repeat for several (default: 640x480)")
+    bench.add_argument("--fps", action="append", type=float, help="Frames per second per camera (default: 30)")
+    bench.add_argument("--cameras", action="append", type=int, help="Number of cameras (default: 1)")
+    bench.add_argument("--frames", type=int, default=300, help="Length of the clip encoded for each resolution")
+    bench.add_argument("--quality", type=int, default=80, help="JPEG quality of the encoded clip")
+    bench.add_argument("--duration", type=float, default=10.0, help="Seconds measured per case")
+    bench.add_argument("--warmup", type=float, default=2.0, help="Seconds run before measuring each case")
+    bench.add_argument("--workers", type=int, default=2, help="Pose worker threads, or processes with --processes")
+    bench.add_argument("--processes", action="store_true", help="Run the pose workers as separate processes")
+    bench.add_argument("--credits", type=int, default=4, help="Frames in flight per camera before the sender waits")
+    bench.add_argument("--motion-threshold", type=float, default=None,
+                       help="Skip frames with less than this share of thumbnail pixels changed "
+                            "(default: exact repeats only)")
+    bench.add_argument("--output", default="benchmark.json", help="Where to write the JSON results")
+
+    rec = commands.add_parser("record", help="Encode a clip into a recording for replay:PATH sources")
+    rec.add_argument("output", help="Recording file to write")
+    rec.add_argument("--source", default="synthetic", help="synthetic or a video file")
+    rec.add_argument("--resolution", type=parse_resolution, default=(640, 480), help="WIDTHxHEIGHT")
+    rec.add_argument("--frames", type=int, default=300, help="Number of frames to record")
+    rec.add_argument("--quality", type=int, default=80, help="JPEG quality")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        args.resolution = args.resolution or [(640, 480)]
+        args.fps = args.fps or [30.0]
+        args.cameras = args.cameras or [1]
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.command == "record":
+        record(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
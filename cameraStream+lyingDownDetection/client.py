@@ -1,113 +1,550 @@
+import argparse
+import functools
+import signal
 import socket
+import threading
+import time
 import cv2
-import struct
 import numpy as np
 import mediapipe as mp
-import threading
+from pipeline import PosePool, DROP_OLDEST, QUEUE_POLICIES
+from process_pool import ProcessPosePool
+from protocol import FrameReceiver
+from dedupe import FrameDeduper
+from posture import PostureTracker, y_spread
+from events import NotificationWriter, DB_PATH
+from metrics import MetricsReporter, PipelineMetrics
+from profiler import SamplingProfiler
+from OpenCVCamera.cameraObjDet import ObjectDetector, PERSON
 
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect(('localhost', 12345))
-# Initialize Mediapipe Pose class and drawing utilities
+# Initialize Mediapipe Pose class
 mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-imagestack = []
-prev_im = cv2.imread("load.jpg")
-# Function to check if person is lying down
-def is_lying_down(landmarks):
-    # Extract the y-coordinates of important body points
-    points_of_interest = ['LEFT_SHOULDER', 'RIGHT_SHOULDER', 'LEFT_HIP', 'RIGHT_HIP', 'LEFT_KNEE', 'RIGHT_KNEE', 'LEFT_ANKLE', 'RIGHT_ANKLE']
-    y_coords = [landmarks[mp_pose.PoseLandmark[point].value].y for point in points_of_interest]
-
-    # Calculate the range of the y-coordinates
-    y_range = np.ptp(y_coords)  # Peak-to-peak (max - min)
-
-    # Set a threshold to determine if the person is lying down
-    # If y_range is small (points are close on the y-axis), the person is lying down
-    return y_range < 0.2  # Adjust threshold as needed
-def image_processing(image2):
-    try:
-        with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-            # Convert the frame to RGB as Mediapipe requires
-            image_rgb = cv2.cvtColor(image2, cv2.COLOR_BGR2RGB)
-            image_rgb.flags.writeable = False  # Improve performance
-
-            # Make pose detection
-            results = pose.process(image_rgb)
-
-            # Draw pose landmarks on the image
-            image_rgb.flags.writeable = True
-            image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
-
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    image_bgr, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2)
-                )
-
-                # Check if person is lying down
-                if is_lying_down(results.pose_landmarks.landmark):
-                    cv2.putText(image_bgr, "Lying Down", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-                else:
-                    cv2.putText(image_bgr, "Not Lying Down", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-
-                # Show the image with pose landmarks
-                #cv2.imshow('Pose Estimation', image_bgr)
-                imagestack.append(image_bgr)
-    except Exception as e:
-        print(e)
+# Landmark pairs joined when drawing a pose, as two index arrays
+POSE_CONNECTIONS = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.int32).reshape(-1, 2)
+# Landmarks less likely than this to be visible are not drawn
+VISIBILITY_THRESHOLD = 0.5
+# Pose worker pool settings: number of warm Pose graphs, how many frames may
+# wait for a free worker, and which frame to drop once that queue is full
+POSE_WORKERS = 2
+POSE_QUEUE_SIZE = 4
+POSE_QUEUE_POLICY = DROP_OLDEST
+# Skip frames where less than this share of the 1/8-scale grayscale
+# thumbnail's pixels changed by more than MOTION_PIXEL_THRESHOLD since the
+# last processed frame (None: exact repeats only)
+MOTION_THRESHOLD = 0.002
+MOTION_PIXEL_THRESHOLD = 12
+# Acknowledge each frame so server.py can throttle when we fall behind
+SEND_ACKS = True
+# Person gate: run MobileNet SSD every DETECT_EVERY frames (tracking the box
+# in between) and only run pose on a crop around the person it finds
+DETECT_EVERY = 5
+GATE_CONFIDENCE = 0.4
+# Seconds between metrics log lines, each covering the window since the last
+METRICS_INTERVAL = 10.0
+
+# Create one Pose graph
+def make_pose():
+    return mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+# Per-worker state: one warm Pose graph per camera, so tracking and landmark
+# smoothing never mix people from different streams, and one reusable RGB
+# buffer per frame shape for the colour conversion MediaPipe needs
+class WorkerPoses:
+    def __init__(self):
+        self._poses = {}
+        self._rgb_buffers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for pose in self._poses.values():
+            pose.close()
+
+    def pose(self, stream_id):
+        if stream_id not in self._poses:
+            self._poses[stream_id] = make_pose()
+        return self._poses[stream_id]
+
+    # Convert into a preallocated buffer; MediaPipe copies its input, so the
+    # buffer can be reused for the next frame straight away. Person crops
+    # change size every frame, so they get a fresh array instead.
+    def to_rgb(self, image_bgr, reuse=True):
+        if not reuse:
+            return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+        buffer = self._rgb_buffers.get(image_bgr.shape)
+        if buffer is None:
+            buffer = self._rgb_buffers[image_bgr.shape] = np.empty_like(image_bgr)
+        return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB, dst=buffer)
+
+# Run pose on image_rgb; returns the pose landmarks as a 33 x 4 array of
+# normalized x, y, z and visibility, None if nobody is in view
+def run_pose(pose, image_rgb):
+    image_rgb.flags.writeable = False  # Improve performance
+
+    # Make pose detection
+    results = pose.process(image_rgb)
+    image_rgb.flags.writeable = True
+    if results.pose_landmarks is None:
+        return None
+    return np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility)
+                     for landmark in results.pose_landmarks.landmark], dtype=np.float32)
+
+# Update the camera's smoothed posture state from a frame's landmarks and
+# return whether the person is lying down. When pose ran on a crop of a
+# taller frame, roi is (x0, y0, x1, y1) of the crop and frame_height the
+# frame's height.
+def classify(landmarks, posture, captured_at, roi=None, frame_height=None):
+    # Landmarks are relative to the image pose saw; the lying threshold is
+    # relative to the whole frame
+    ys = landmarks[:, 1]
+    if roi is not None:
+        ys = (roi[1] + ys * (roi[3] - roi[1])) / frame_height
+    return posture.update(float(y_spread(ys)), captured_at)
+
+# Draw pose landmarks and the posture label onto a BGR frame, and the person
+# crop pose ran on, if any. Same look as MediaPipe's draw_landmarks, but
+# straight from the landmark array.
+def draw_detection(image_bgr, landmarks, lying, roi=None):
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        cv2.rectangle(image_bgr, (x0, y0), (x1 - 1, y1 - 1), (255, 255, 0), 1)
+    target = image_bgr if roi is None else image_bgr[y0:y1, x0:x1]
+    h, w = target.shape[:2]
+    xy = landmarks[:, :2]
+    shown = (landmarks[:, 3] >= VISIBILITY_THRESHOLD) & (xy >= 0).all(axis=1) & (xy <= 1).all(axis=1)
+    points = np.minimum((xy * (w, h)).astype(np.int32), (w - 1, h - 1))
+    for a, b in POSE_CONNECTIONS:
+        if shown[a] and shown[b]:
+            cv2.line(target, tuple(points[a].tolist()), tuple(points[b].tolist()), (255, 0, 0), 2)
+    for point in points[shown].tolist():
+        cv2.circle(target, tuple(point), 2, (0, 255, 0), 2)
+    if lying:
+        cv2.putText(image_bgr, "Lying Down", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+    else:
+        cv2.putText(image_bgr, "Not Lying Down", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+
+# One camera connection. Its thread receives, dedupes and decodes frames and
+# feeds them into the shared pose pool, timing each stage into metrics and
+# sampling the pool's queue depth after every submit. With encoded=True the
+# pool is a ProcessPosePool and frames go to it still compressed; the worker
+# processes decode and gate them. origin(stream_id, data), if given, returns
+# the time.monotonic() at which the sender captured a frame, or None if it
+# doesn't know; frames are then timed from capture rather than arrival.
+class CameraStream:
+    def __init__(self, stream_id, address, pool, name=None, notifications=None, motion_threshold=MOTION_THRESHOLD,
+                 person_gate=None, metrics=None, encoded=False, origin=None):
+        self.stream_id = stream_id
+        self.address = address
+        self.name = name or f"Camera {stream_id}"
+        self.pool = pool
+        self.encoded = encoded
+        self.origin = origin
+        self.notifications = notifications
+        # Optional ObjectDetector; frames without a person skip pose entirely
+        self.person_gate = person_gate
+        self.skipped_empty = 0
+        self.metrics = metrics or PipelineMetrics()
+        self.deduper = FrameDeduper(motion_threshold=motion_threshold, pixel_threshold=MOTION_PIXEL_THRESHOLD)
+        # MediaPipe Pose tracks a single person, so one posture state per camera
+        self.posture = PostureTracker(on_change=self._posture_changed)
+        self.finished = threading.Event()
+        self._closing = False
+        self.socket = socket.create_connection(address)
+        self._thread = threading.Thread(target=self._run, name=f"camera-{stream_id}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        receiver = FrameReceiver(self.socket, send_acks=SEND_ACKS)
+        seq = 0
+        try:
+            metrics = self.metrics
+            while True:
+                # Retrieve the next length-prefixed frame; data is a view into the
+                # receiver's buffer and is only valid until the next recv_frame()
+                data = receiver.recv_frame()
+                if data is None:
+                    break
+                # Timed from the header's arrival, not from waiting for it
+                arrived = time.monotonic()
+                metrics.observe("receive", arrived - receiver.header_at)
+                captured_at = self.origin(self.stream_id, data) if self.origin is not None else None
+                if captured_at is None:
+                    captured_at = arrived
+
+                # Static scene: skip decode and pose entirely
+                started = time.monotonic()
+                duplicate = self.deduper.is_duplicate(data)
+                metrics.observe("dedupe", time.monotonic() - started)
+                if duplicate:
+                    metrics.count("duplicates")
+                    continue
+
+                if self.encoded:
+                    self.pool.submit(self.stream_id, data, (self, seq, captured_at))
+                    metrics.gauge("queue_depth", self.pool.qsize())
+                    seq += 1
+                    continue
+
+                # Wrap the frame bytes in a numpy array (no copy) and decode it
+                started = time.monotonic()
+                frame_array = np.frombuffer(data, dtype=np.uint8)
+                image = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+                metrics.observe("decode", time.monotonic() - started)
+
+                # If the image is None, the frame was corrupted
+                if image is None:
+                    print("Failed to decode image")
+                    metrics.count("decode_failed")
+                    continue
+                if len(image.shape) == 2:  # Grayscale image (2D array)
+                    metrics.count("grayscale")
+                    image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+                image = image.astype(np.uint8, copy=False)
+                roi = None
+                if self.person_gate is not None:
+                    started = time.monotonic()
+                    roi = self.person_gate.person_roi(image)
+                    metrics.observe("gate", time.monotonic() - started)
+                    if roi is None:
+                        self.skipped_empty += 1
+                        metrics.count("no_person")
+                        continue
+                self.pool.submit((self, seq, captured_at, image, roi))
+                metrics.gauge("queue_depth", self.pool.qsize())
+                seq += 1
+        # Socket errors, a bad frame header (ValueError) or the pool closing
+        # under us (RuntimeError) end this camera only; during close() they
+        # are expected and not reported
+        except (OSError, ValueError, RuntimeError) as e:
+            if not self._closing:
+                print(f"Camera {self.stream_id}: {e}")
+        finally:
+            self.finished.set()
+
+    # Report falls and lying down to the dashboard's notifications table
+    def _posture_changed(self, lying, fell):
+        if not lying or self.notifications is None:
+            return
+        where = f"{self.address[0]}:{self.address[1]}"
+        if fell:
+            self.notifications.emit(self.name, f"Fall detected on camera {where}", "Fall")
+        else:
+            self.notifications.emit(self.name, f"Lying down on camera {where}", "Lying Down")
+
+    def close(self):
+        self._closing = True
+        try:
+            # Unblocks a recv() in progress, unlike close() on its own
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self._thread.is_alive():
+            self._thread.join(timeout=1)
+        self.socket.close()
+        print(f"Camera {self.stream_id}: skipped duplicates: {self.deduper.exact_duplicates} exact, "
+              f"{self.deduper.near_duplicates} near; skipped with nobody in view: {self.skipped_empty}")
+
+# Runs in each ProcessPosePool worker process: decodes, gates and runs pose
+# on compressed frames, with a warm Pose graph and person gate per camera.
+# Returns (landmarks, roi, frame_height, timings, skipped): timings are the
+# seconds spent in each stage, and skipped says why there is nothing to
+# classify ("decode_failed" or "no_person"), else None.
+class ProcessWorker:
+    def __init__(self, make_gate=None):
+        self.poses = WorkerPoses()
+        self.make_gate = make_gate
+        self.gates = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.poses.__exit__(*exc)
+
+    def __call__(self, stream_id, payload):
+        started = time.monotonic()
+        image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        decoded = time.monotonic()
+        timings = {"decode": decoded - started}
+        if image is None:
+            return None, None, None, timings, "decode_failed"
+        roi = None
+        if self.make_gate is not None:
+            if stream_id not in self.gates:
+                self.gates[stream_id] = self.make_gate()
+            roi = self.gates[stream_id].person_roi(image)
+            gated = time.monotonic()
+            timings["gate"] = gated - decoded
+            decoded = gated
+            if roi is None:
+                return None, None, None, timings, "no_person"
+        crop = image if roi is None else image[roi[1]:roi[3], roi[0]:roi[2]]
+        landmarks = run_pose(self.poses.pose(stream_id), self.poses.to_rgb(crop, reuse=roi is None))
+        timings["pose"] = time.monotonic() - decoded
+        return landmarks, roi, image.shape[0], timings, None
+
+# The detection pipeline as a library, with no display dependency: camera
+# streams feeding one shared pose pool, posture tracking and notifications.
+# Anything that wants the processed frames subscribes a callback(stream, seq,
+# image); callbacks run on pool worker threads and must not block. Frames
+# are only annotated while someone is subscribed. make_gate, if given,
+# builds each camera's person gate (see make_person_gate). Stage timings of
+# every camera are collected in self.metrics: receive, dedupe, decode, gate,
+# pose, classify, draw, and end_to_end from a frame's arrival (or capture,
+# with origin; see CameraStream) to its classification; along with the pose
+# queue's depth, frames it dropped, and frames processed per camera
+# ("camera N frames").
+# With processes=True the workers are processes instead of threads (see
+# ProcessPosePool): cameras hand them compressed frames through shared
+# memory and get landmark arrays back, so adding cameras scales across
+# cores. Each worker then has its own queue_size frames in flight, the
+# queue policy is always drop-newest.
+class VisionService:
+    def __init__(self, servers, workers=POSE_WORKERS, queue_size=POSE_QUEUE_SIZE, policy=POSE_QUEUE_POLICY,
+                 notifications=None, motion_threshold=MOTION_THRESHOLD, make_gate=None, processes=False, origin=None):
+        self.subscribers = []
+        self.metrics = PipelineMetrics()
+        self.streams = []
+        on_drop = lambda frame: self.metrics.count("queue_dropped")
+        if processes:
+            self.pool = ProcessPosePool(functools.partial(ProcessWorker, make_gate), self._process_result,
+                                        workers=workers, queue_size=queue_size, on_drop=on_drop)
+        else:
+            self.pool = PosePool(WorkerPoses, self._process_frame, workers=workers, queue_size=queue_size,
+                                 policy=policy, on_drop=on_drop)
+        try:
+            for stream_id, (address, name) in enumerate(servers):
+                self.streams.append(CameraStream(stream_id, address, self.pool, name=name,
+                                                 notifications=notifications, motion_threshold=motion_threshold,
+                                                 person_gate=make_gate() if make_gate and not processes else None,
+                                                 metrics=self.metrics, encoded=processes, origin=origin))
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def start(self):
+        for stream in self.streams:
+            stream.start()
+
+    # Wait up to timeout seconds for every stream to end; True once they have
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for stream in self.streams:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not stream.finished.wait(remaining):
+                return False
+        return True
+
+    # Pool worker entry point: run pose on one (stream, seq, captured_at,
+    # image, roi) frame. roi is the person crop to run pose on, or None for
+    # the whole frame.
+    def _process_frame(self, poses, frame):
+        stream, seq, captured_at, image, roi = frame
+        started = time.monotonic()
+        crop = image if roi is None else image[roi[1]:roi[3], roi[0]:roi[2]]
+        landmarks = run_pose(poses.pose(stream.stream_id), poses.to_rgb(crop, reuse=roi is None))
+        self.metrics.observe("pose", time.monotonic() - started)
+        self._finish(stream, seq, captured_at, landmarks, roi, image.shape[0], image=image)
+
+    # ProcessPosePool result handler, on its collector thread: token is what
+    # CameraStream submitted, result what ProcessWorker returned, and payload
+    # the compressed frame, still in the worker's ring
+    def _process_result(self, token, result, payload):
+        stream, seq, captured_at = token
+        if result is None:
+            return
+        landmarks, roi, frame_height, timings, skipped = result
+        for stage, seconds in timings.items():
+            self.metrics.observe(stage, seconds)
+        if skipped is not None:
+            self.metrics.count(skipped)
+            if skipped == "no_person":
+                stream.skipped_empty += 1
+            return
+        self._finish(stream, seq, captured_at, landmarks, roi, frame_height, payload=payload)
+
+    # Classify a frame's landmarks, then annotate the frame for subscribers.
+    # Worker processes only send landmarks back, so their frames are decoded
+    # again from payload, and only while someone is subscribed.
+    def _finish(self, stream, seq, captured_at, landmarks, roi, frame_height, image=None, payload=None):
+        metrics = self.metrics
+        lying = False
+        if landmarks is not None:
+            started = time.monotonic()
+            lying = classify(landmarks, stream.posture, captured_at, roi, frame_height)
+            metrics.observe("classify", time.monotonic() - started)
+        metrics.observe("end_to_end", time.monotonic() - captured_at)
+        metrics.count(f"camera {stream.stream_id} frames")
+        if not self.subscribers:
+            return
+        if image is None:
+            image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        # Draw straight onto the decoded BGR frame, which saves converting
+        # the RGB copy back
+        if landmarks is not None:
+            started = time.monotonic()
+            draw_detection(image, landmarks, lying, roi)
+            metrics.observe("draw", time.monotonic() - started)
+        for callback in self.subscribers:
+            callback(stream, seq, image)
+
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+        self.pool.close()
+        print(f"Frames dropped with the worker queue full: {self.pool.dropped}")
+
+# A person gate for one camera: its own detector, since tracking follows a
+# single stream's frames in order
+def make_person_gate(detect_every=DETECT_EVERY, confidence=GATE_CONFIDENCE):
+    return ObjectDetector(confidence=confidence, classes=[PERSON], detect_every=detect_every)
+
+# Optional display subscriber: keeps only the newest processed frame per
+# camera, so workers just swap a reference in and a slow window drops frames
+# instead of holding up detection. Frames replaced before they were shown
+# count as "display_dropped" in metrics, if given, and frames that finish
+# after a newer one from the same camera as "display_reordered". show() runs
+# on the main thread and times each frame it puts on screen as "display".
+class Display:
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self._latest = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.count(name)
+
+    def __call__(self, stream, seq, image):
+        with self._lock:
+            # Workers can finish out of order; never step back in time
+            if seq <= self._latest.get(stream.stream_id, -1):
+                self._count("display_reordered")
+                return
+            self._latest[stream.stream_id] = seq
+            if stream.stream_id in self._pending:
+                self._count("display_dropped")
+            self._pending[stream.stream_id] = image
+
+    # Show any new frames; returns False once 'q' is pressed
+    def show(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for stream_id, image in pending.items():
+            started = time.monotonic()
+            cv2.imshow(f"Processed Image {stream_id}", image)
+            if self.metrics is not None:
+                self.metrics.observe("display", time.monotonic() - started)
+        return cv2.waitKey(1) & 0xFF != ord('q')
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+# "host:port[=name]" -> ((host, port), name); name is who the camera watches
+def parse_server(value):
+    address, _, name = value.partition("=")
+    host, _, port = address.rpartition(":")
+    return (host or "localhost", int(port)), name or None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detect people lying down in one or more camera streams")
+    parser.add_argument("--server", action="append", type=parse_server,
+                        help="host:port of a server.py source, optionally =NAME of the person it watches; "
+                             "repeat for several cameras (default: localhost:12345)")
+    parser.add_argument("--workers", type=int, default=POSE_WORKERS, help="Pose worker threads")
+    parser.add_argument("--queue-size", type=int, default=POSE_QUEUE_SIZE, help="Frames waiting for a worker")
+    parser.add_argument("--policy", choices=QUEUE_POLICIES, default=POSE_QUEUE_POLICY,
+                        help="Which frame to drop when the worker queue is full")
+    parser.add_argument("--processes", action="store_true",
+                        help="Run the pose workers as processes fed through shared memory, to use more cores; "
+                             "--queue-size then applies per worker and the newest frame is always the one dropped")
+    parser.add_argument("--db", default=DB_PATH, help="Dashboard database that receives fall notifications")
+    parser.add_argument("--no-notifications", action="store_true", help="Don't write events to the database")
+    parser.add_argument("--cooldown", type=float, default=60.0,
+                        help="Seconds before the same event for the same person is reported again")
+    parser.add_argument("--headless", action="store_true", help="Don't open display windows, e.g. on edge boxes")
+    parser.add_argument("--person-gate", action="store_true",
+                        help="Only run pose on a crop around a person found by MobileNet SSD "
+                             "(needs OpenCVCamera/MobileNetSSD_deploy.caffemodel)")
+    parser.add_argument("--detect-every", type=int, default=DETECT_EVERY,
+                        help="With --person-gate, run the detector every N frames and track in between")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL,
+                        help="Seconds between metrics log lines and endpoint updates (0: no metrics reporting)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Also serve the latest metrics as JSON on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--quiet-metrics", action="store_true",
+                        help="Don't print metrics log lines (the endpoint still updates)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Run a sampling profiler and write collapsed stacks (flamegraph format) to PATH")
+    parser.add_argument("--profile-interval-ms", type=float, default=10,
+                        help="Milliseconds between profiler samples")
+    args = parser.parse_args()
+    args.server = args.server or [(("localhost", 12345), None)]
+    return args
 
 def main():
-    global prev_im
-    data = b""
+    args = parse_args()
+    notifications = None
+    if not args.no_notifications:
+        try:
+            notifications = NotificationWriter(args.db, cooldown=args.cooldown)
+        except RuntimeError as e:
+            raise SystemExit(f"{e}, or pass --no-notifications")
+    make_gate = functools.partial(make_person_gate, args.detect_every) if args.person_gate else None
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler(interval=args.profile_interval_ms / 1000)
+        profiler.start()
+    # Run as a daemon: SIGTERM shuts down as cleanly as 'q' or Ctrl+C
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    display = reporter = None
     try:
-        while True:
-            data = b""
-            # Retrieve message size
-            data_size = client_socket.recv(4)
-            if not data_size:
-                break
-            frame_size = struct.unpack(">I", data_size)[0]
-            #print(frame_size)
-            # Retrieve the actual frame data
-            while len(data) < frame_size:
-                packet = client_socket.recv(frame_size - len(data))
-                if not packet:
-                    return None
-                data += packet
-            print(f"Expected frame size: {frame_size}, Received data size: {len(data)}")
-
-
-            # Convert frame_data into a numpy array and decode it
-            frame_array = np.frombuffer(data, dtype=np.uint8)
-            image = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
-            print(image)
-
-            # If the image is None, the frame was corrupted
-            if image is None:
-                print("Failed to decode image")
-                continue
-            if len(image.shape) == 2:  # Grayscale image (2D array)
-                print("Image is grayscale, converting to BGR")
-                image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-
-            image = image.astype(np.uint8)
-            if np.array_equal(prev_im, image):
-                continue
-            threading.Thread(target=image_processing, args=(image,)).start()
-            prev_im = image
-            try:
-                if imagestack:  # Check if there's an image in the stack
-                    cv2.imshow("Processed Image", imagestack[0])
-                    imagestack.pop(0)
-            except Exception as e:
-                print(e)
-            # Break the loop on 'q' key press
-            if cv2.waitKey(10) & 0xFF == ord('q'):
-                break
+        with VisionService(args.server, workers=args.workers, queue_size=args.queue_size, policy=args.policy,
+                           notifications=notifications, make_gate=make_gate, processes=args.processes) as service:
+            if not args.headless:
+                display = Display(service.metrics)
+                service.subscribe(display)
+            if args.metrics_interval > 0:
+                reporter = MetricsReporter(service.metrics, interval=args.metrics_interval,
+                                           log=not args.quiet_metrics, port=args.metrics_port)
+                if reporter.address is not None:
+                    print(f"Serving metrics on http://{reporter.address[0]}:{reporter.address[1]}/metrics")
+            service.start()
+            while not stop.is_set() and not service.wait(0.01 if display else 0.5):
+                if display is not None and not display.show():
+                    break
+    except KeyboardInterrupt:
+        pass
     finally:
-        client_socket.close()
-        cv2.destroyAllWindows()
+        if reporter is not None:
+            reporter.close()
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(args.profile)
+            print(f"Profile of {profiler.samples} samples written to {args.profile}; busiest frames:")
+            for function, share in profiler.top():
+                print(f"  {share:6.1%}  {function}")
+        if notifications is not None:
+            notifications.close()
+            print(f"Notifications written: {notifications.written}, "
+                  f"suppressed by cooldown: {notifications.suppressed}, dropped: {notifications.dropped}")
+        if display is not None:
+            display.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
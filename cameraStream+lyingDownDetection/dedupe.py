@@ -0,0 +1,63 @@
+import hashlib
+import time
+
+import cv2
+import numpy as np
+
+
+# Decides from the compressed JPEG bytes whether a frame is worth decoding.
+# Exact repeats are caught by hashing the payload. If motion_threshold is set,
+# the frame is also decoded at 1/8 scale in grayscale (which libjpeg does far
+# cheaper than a full decode) and compared against the last accepted frame:
+# a thumbnail pixel has changed when it differs by more than pixel_threshold
+# (0-255 scale), and a frame with less than motion_threshold of its pixels
+# changed (a share, 0-1) counts as a near-duplicate. Counting changed pixels
+# rather than averaging the difference means a small moving region, such as
+# a person far from the camera, still counts as motion. At least one frame
+# is let through every refresh_interval seconds so a completely static scene
+# still gets re-checked now and then.
+class FrameDeduper:
+    def __init__(self, motion_threshold=None, pixel_threshold=12, refresh_interval=1.0):
+        self.motion_threshold = motion_threshold
+        self.pixel_threshold = pixel_threshold
+        self.refresh_interval = refresh_interval
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self._last_digest = None
+        self._reference = None
+        self._last_accepted = float("-inf")
+
+    # True if the frame in payload (bytes or memoryview) can be skipped
+    def is_duplicate(self, payload):
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        exact = digest == self._last_digest
+        self._last_digest = digest
+
+        now = time.monotonic()
+        if now - self._last_accepted >= self.refresh_interval:
+            return self._accept(payload, now)
+        if exact:
+            self.exact_duplicates += 1
+            return True
+        if self.motion_threshold is None:
+            return self._accept(payload, now)
+
+        thumbnail = self._thumbnail(payload)
+        if thumbnail is None or self._reference is None or thumbnail.shape != self._reference.shape:
+            return self._accept(payload, now, thumbnail)
+        changed = np.count_nonzero(cv2.absdiff(thumbnail, self._reference) > self.pixel_threshold)
+        if changed < self.motion_threshold * thumbnail.size:
+            self.near_duplicates += 1
+            return True
+        return self._accept(payload, now, thumbnail)
+
+    def _thumbnail(self, payload):
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+    # The reference only moves on accepted frames, so slow drift still adds
+    # up to a detected change instead of being absorbed frame by frame
+    def _accept(self, payload, now, thumbnail=None):
+        if self.motion_threshold is not None:
+            self._reference = thumbnail if thumbnail is not None else self._thumbnail(payload)
+        self._last_accepted = now
+        return False
@@ -0,0 +1,120 @@
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+# The dashboard's database, at the top of the repository
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "medical_data.db")
+
+_STOP = object()
+
+
+# Writes vision events (falls, lying down) to the dashboard's notifications
+# table from a background thread. emit() never blocks: events go on a bounded
+# queue, and the writer inserts whatever has piled up in one transaction at
+# least every flush_interval seconds. Repeats of the same (name, type) within
+# cooldown seconds are dropped before they are queued. The table belongs to
+# the dashboard (db.py), so the database must already have been set up by it;
+# otherwise the constructor raises RuntimeError.
+class NotificationWriter:
+    def __init__(self, db_path=DB_PATH, cooldown=60.0, flush_interval=0.25, batch_size=256, queue_size=10000):
+        self.db_path = db_path
+        self.cooldown = cooldown
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.suppressed = 0
+        self.dropped = 0
+        self._last_emitted = {}
+        self._lock = threading.Lock()
+        self._connect().close()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="notification-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Queue one notification; returns False if it was deduplicated or dropped
+    def emit(self, name, abnormal_data, abnormal_type, now=None):
+        now = time.monotonic() if now is None else now
+        key = (name, abnormal_type)
+        with self._lock:
+            last = self._last_emitted.get(key)
+            if last is not None and now - last < self.cooldown:
+                self.suppressed += 1
+                return False
+            self._last_emitted[key] = now
+        # Same format as SQLite's CURRENT_TIMESTAMP, which the dashboard sorts on
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self._queue.put_nowait((name, abnormal_data, abnormal_type, timestamp))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    # Open the existing database; never creates the file or the table
+    def _connect(self):
+        try:
+            conn = sqlite3.connect(pathlib.Path(self.db_path).resolve().as_uri() + "?mode=rw", uri=True)
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"Can't open {self.db_path} ({e}); run python db.py to create it") from None
+        found = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notifications'").fetchone()
+        if found is None:
+            conn.close()
+            raise RuntimeError(f"{self.db_path} has no notifications table; run python db.py to set it up")
+        # WAL lets the dashboard keep reading while we write
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # Wait for the first event, then collect more for up to flush_interval
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = batch[-1] is _STOP
+                rows = batch[:-1] if stop else batch
+                if rows:
+                    try:
+                        with conn:
+                            conn.executemany("""
+                                INSERT INTO notifications (name, abnormal_data, abnormal_type, timestamp)
+                                VALUES (?, ?, ?, ?)
+                            """, rows)
+                        self.written += len(rows)
+                    except sqlite3.Error as e:
+                        print(f"Failed to write {len(rows)} notifications: {e}")
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    # Write out everything still queued, then stop the writer thread
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
@@ -0,0 +1,189 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds: 20 per decade from 1 us to 10 s,
+# so any percentile read back is within about 6% of the true value
+BOUNDS = [10 ** (exponent / 20) for exponent in range(-120, 21)]
+
+
+# Fixed-size latency histogram that any number of threads can record into.
+# Recording is a binary search and an increment, so it can stay on in the
+# hot loop; percentiles are read back from the bucket counts.
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    # Value below which fraction q of the observations fall: the geometric
+    # middle of the bucket holding it
+    def percentile(self, q):
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                if index == 0:
+                    return BOUNDS[0]
+                if index == len(BOUNDS):
+                    return largest
+                return min((BOUNDS[index - 1] * BOUNDS[index]) ** 0.5, largest)
+        return largest
+
+    # count, mean and p50/p95/p99/max in milliseconds
+    def summary(self):
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": 1000 * self.total / count if count else 0.0,
+            "p50_ms": 1000 * self.percentile(0.50),
+            "p95_ms": 1000 * self.percentile(0.95),
+            "p99_ms": 1000 * self.percentile(0.99),
+            "max_ms": 1000 * self.max,
+        }
+
+
+# Per-stage timings, event counters and gauges (e.g. queue depth) for the
+# vision pipeline
+class PipelineMetrics:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # Record the current value of something like a queue's depth; snapshots
+    # report the last value and the largest since the last reset
+    def gauge(self, name, value):
+        with self._lock:
+            last, largest = self.gauges.get(name, (value, value))
+            self.gauges[name] = (value, max(largest, value))
+
+    # Everything recorded since the last reset, with each stage's throughput
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        stages = {}
+        for stage, histogram in list(self.stages.items()):
+            summary = histogram.summary()
+            summary["per_second"] = summary["count"] / elapsed if elapsed > 0 else 0.0
+            stages[stage] = summary
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = {name: {"last": last, "max": largest} for name, (last, largest) in self.gauges.items()}
+        return {"elapsed_s": elapsed, "stages": stages, "counters": counters, "gauges": gauges}
+
+    # Start a new window; stages keep their order, so log lines line up
+    def reset(self):
+        with self._lock:
+            self.stages = {stage: Histogram() for stage in self.stages}
+            self.counters = {}
+            self.gauges = {}
+            self.started = time.monotonic()
+
+
+# One log line for a snapshot: p50/p95 of every stage, then counters as
+# totals and per-second rates, then gauges
+def format_snapshot(snapshot):
+    elapsed = snapshot["elapsed_s"]
+    parts = [f"{stage} {summary['p50_ms']:.1f}/{summary['p95_ms']:.1f} ms"
+             for stage, summary in snapshot["stages"].items() if summary["count"]]
+    parts += [f"{name} {count} ({count / elapsed:.1f}/s)" if elapsed > 0 else f"{name} {count}"
+              for name, count in sorted(snapshot["counters"].items())]
+    parts += [f"{name} {gauge['last']} (max {gauge['max']})" for name, gauge in sorted(snapshot["gauges"].items())]
+    return f"metrics over {elapsed:.1f}s, stage p50/p95: " + ", ".join(parts)
+
+
+# Reports a PipelineMetrics every interval seconds, each time over the window
+# since the previous report: as a printed log line unless log=False, and as
+# JSON from http://host:port/metrics if a port is given (0 picks a free one).
+# The endpoint serves the last complete window, so scraping it never resets
+# anything.
+class MetricsReporter:
+    def __init__(self, metrics, interval=10.0, log=True, port=None, host="127.0.0.1"):
+        self.metrics = metrics
+        self.interval = interval
+        self.log = log
+        self.latest = metrics.snapshot()
+        self.server = None
+        self._stop = threading.Event()
+        if port is not None:
+            self.server = ThreadingHTTPServer((host, port), self._handler())
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self):
+        return None if self.server is None else self.server.server_address
+
+    def _handler(self):
+        reporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(reporter.latest).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Scrapes would otherwise be logged to stderr one line each
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def report(self):
+        self.latest = self.metrics.snapshot()
+        self.metrics.reset()
+        if self.log:
+            print(format_snapshot(self.latest))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,93 @@
+import queue
+import threading
+
+# What to do with a new frame when the worker queue is full
+DROP_OLDEST = "drop_oldest"  # discard the stalest queued frame to make room
+DROP_NEWEST = "drop_newest"  # discard the incoming frame and keep the queue as is
+QUEUE_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+_STOP = object()
+
+
+# Fixed-size pool of long-lived workers, each owning one warm pose estimator.
+# make_pose() is called once per worker and must return a context manager
+# (e.g. mp_pose.Pose); handle_frame(pose, frame) is called for every frame and
+# on_drop(frame), if given, for every frame the queue policy throws away.
+class PosePool:
+    def __init__(self, make_pose, handle_frame, workers=2, queue_size=4, policy=DROP_OLDEST, on_drop=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}, expected one of {QUEUE_POLICIES}")
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must be at least 1")
+        self.policy = policy
+        self.dropped = 0
+        self._make_pose = make_pose
+        self._handle_frame = handle_frame
+        self._on_drop = on_drop
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"pose-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    # Queue a frame without ever blocking the caller. Returns False if the
+    # frame was dropped because of the drop-newest policy.
+    def submit(self, frame):
+        if self._closed:
+            raise RuntimeError("PosePool is closed")
+        while True:
+            try:
+                self._queue.put_nowait(frame)
+                return True
+            except queue.Full:
+                if self.policy == DROP_NEWEST:
+                    self._drop(frame)
+                    return False
+            try:
+                stale = self._queue.get_nowait()
+                self._queue.task_done()
+                self._drop(stale)
+            except queue.Empty:
+                pass
+
+    def _drop(self, frame):
+        with self._lock:
+            self.dropped += 1
+        if self._on_drop is not None:
+            self._on_drop(frame)
+
+    def _run(self):
+        with self._make_pose() as pose:
+            while True:
+                frame = self._queue.get()
+                try:
+                    if frame is _STOP:
+                        return
+                    self._handle_frame(pose, frame)
+                except Exception as e:
+                    print(e)
+                finally:
+                    self._queue.task_done()
+
+    # Let queued frames finish, then stop every worker
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+
+# MediaPipe PoseLandmark indices of the body points used to decide whether
+# someone is lying down: shoulders, hips, knees and ankles (left, right)
+LYING_INDICES = np.array([11, 12, 23, 24, 25, 26, 27, 28])
+# If the points are closer than this on the y-axis (as a fraction of frame
+# height), the person is lying down
+LYING_THRESHOLD = 0.2
+
+
+# Peak-to-peak spread of the points of interest. ys has landmarks on its last
+# axis, so a whole buffered clip of shape (frames, 33) is scored in one call.
+def y_spread(ys):
+    return np.ptp(np.asarray(ys)[..., LYING_INDICES], axis=-1)
+
+
+# Per-person lying-down state that doesn't flicker. The spread is averaged
+# over the last `window` samples; the state only flips to lying once that
+# average drops below lying_threshold, and back once it rises above
+# standing_threshold (hysteresis), and in both cases only after the new state
+# has been wanted for min_dwell seconds. Samples older than the newest one
+# seen are ignored, so updates from several workers can arrive in any order.
+# on_change(lying, fell), if given, is called on every state change; fell is
+# True when the person went from upright to lying within fall_seconds.
+class PostureTracker:
+    def __init__(self, window=5, lying_threshold=LYING_THRESHOLD, standing_threshold=0.3, min_dwell=1.0,
+                 fall_seconds=1.0, on_change=None):
+        if standing_threshold < lying_threshold:
+            raise ValueError("standing_threshold must not be below lying_threshold")
+        self.lying_threshold = lying_threshold
+        self.standing_threshold = standing_threshold
+        self.min_dwell = min_dwell
+        self.fall_seconds = fall_seconds
+        self.on_change = on_change
+        self.lying = False
+        self.fell = False
+        self.changed_at = None
+        self._last_upright = None
+        self._first_low = None
+        self._spreads = deque(maxlen=window)
+        self._last_sample = float("-inf")
+        self._pending_since = None
+        self._lock = threading.Lock()
+
+    # Feed one frame's spread taken at time `now`; returns the current state
+    def update(self, spread, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now < self._last_sample:
+                return self.lying
+            self._last_sample = now
+            # Raw per-frame extremes, to time how fast someone went down
+            if spread > self.standing_threshold:
+                self._last_upright = now
+                self._first_low = None
+            elif spread < self.lying_threshold and self._first_low is None:
+                self._first_low = now
+            self._spreads.append(spread)
+            average = sum(self._spreads) / len(self._spreads)
+            if self.lying:
+                wants_change = average > self.standing_threshold
+            else:
+                wants_change = average < self.lying_threshold
+            if not wants_change:
+                self._pending_since = None
+            elif self._pending_since is None:
+                self._pending_since = now
+            if self._pending_since is None or now - self._pending_since < self.min_dwell:
+                return self.lying
+            self.lying = not self.lying
+            self.changed_at = now
+            self._pending_since = None
+            self.fell = (self.lying and self._last_upright is not None and self._first_low is not None
+                         and self._first_low - self._last_upright <= self.fall_seconds)
+            lying, fell = self.lying, self.fell
+        if self.on_change is not None:
+            self.on_change(lying, fell)
+        return lying
+
+
+# Replay a clip of spreads (one per frame, at the given timestamps) through a
+# fresh tracker and return the smoothed state for every frame
+def track_clip(spreads, timestamps, **tracker_args):
+    tracker = PostureTracker(**tracker_args)
+    return np.array([tracker.update(float(spread), float(now)) for spread, now in zip(spreads, timestamps)])
@@ -0,0 +1,197 @@
+import collections
+import multiprocessing
+import signal
+import threading
+from multiprocessing import shared_memory
+
+_STOP = None
+
+
+# Ring buffer of variable-length frames in one shared-memory block. Only the
+# parent process keeps the bookkeeping: it copies a frame in with write(),
+# hands the offset to a worker process, which reads the bytes in place, and
+# frees frames with release() in the order they were written.
+class FrameRing:
+    def __init__(self, size):
+        self.size = size
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self._head = 0
+        # (offset, length) of every frame still in use, oldest first
+        self._frames = collections.deque()
+
+    def __len__(self):
+        return len(self._frames)
+
+    # Copy payload in after the newest frame, wrapping round to the start if
+    # it doesn't fit at the end. Returns its offset, or None if the frames
+    # still in use leave no room. The head never catches up with the oldest
+    # frame exactly, so head == tail always means empty.
+    def write(self, payload):
+        length = len(payload)
+        if not self._frames:
+            offset = 0 if length <= self.size else None
+        else:
+            tail = self._frames[0][0]
+            if self._head > tail:
+                offset = self._head if self.size - self._head >= length else 0 if length < tail else None
+            else:
+                offset = self._head if tail - self._head > length else None
+        if offset is None:
+            return None
+        self.shm.buf[offset:offset + length] = payload
+        self._head = offset + length
+        self._frames.append((offset, length))
+        return offset
+
+    # The oldest frame still in use, as a view into the ring
+    def oldest(self):
+        offset, length = self._frames[0]
+        return self.shm.buf[offset:offset + length]
+
+    def release(self):
+        self._frames.popleft()
+        if not self._frames:
+            self._head = 0
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Worker process entry point: attach to the ring and run worker(key, payload)
+# on every frame named on the task queue, in order, until told to stop
+def _work(index, make_worker, ring_name, tasks, results):
+    # Ctrl+C reaches the whole process group; the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = shared_memory.SharedMemory(name=ring_name)
+    try:
+        with make_worker() as worker:
+            while True:
+                task = tasks.get()
+                if task is _STOP:
+                    return
+                key, offset, length = task
+                try:
+                    with ring.buf[offset:offset + length] as payload:
+                        result = worker(key, payload)
+                except Exception as e:
+                    print(e)
+                    result = None
+                results.put((index, result))
+    finally:
+        ring.close()
+
+
+# Pose workers as separate processes, so decoding, colour conversion and the
+# pose graph run in parallel instead of taking turns on the GIL. Frames
+# arrive still compressed and are copied once into the chosen worker's
+# shared-memory FrameRing; only (key, offset, length) goes through a pipe.
+# Every key (camera) is pinned to one worker, key % workers, so its frames
+# are handled in order by the same warm state. make_worker is a picklable
+# callable run once in each worker process; it returns a context manager
+# whose __call__(key, payload) returns a small picklable result, such as a
+# landmark array. on_result(token, result, payload) is called in the parent,
+# on a collector thread, in submit order per worker; token is whatever the
+# caller passed to submit() and never leaves the parent process. Nothing
+# already handed to a worker can be taken back, so a frame that finds its
+# worker with queue_size frames in flight or its ring full is dropped
+# (drop-newest), and on_drop(token), if given, is called for it.
+class ProcessPosePool:
+    def __init__(self, make_worker, on_result, workers=2, queue_size=4, ring_bytes=8 << 20, on_drop=None):
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must be at least 1")
+        context = multiprocessing.get_context("spawn")
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._on_result = on_result
+        self._on_drop = on_drop
+        self._lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(workers)]
+        self._pending = [collections.deque() for _ in range(workers)]
+        self._rings = []
+        self._tasks = []
+        self._processes = []
+        self._results = context.SimpleQueue()
+        self._closed = False
+        try:
+            for index in range(workers):
+                ring = FrameRing(ring_bytes)
+                self._rings.append(ring)
+                tasks = context.SimpleQueue()
+                self._tasks.append(tasks)
+                process = context.Process(target=_work, args=(index, make_worker, ring.shm.name, tasks, self._results),
+                                          name=f"pose-process-{index}", daemon=True)
+                process.start()
+                self._processes.append(process)
+        except Exception:
+            self.close()
+            raise
+        self._collector = threading.Thread(target=self._collect, name="pose-results", daemon=True)
+        self._collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Frames handed to workers and not yet returned
+    def qsize(self):
+        return sum(len(pending) for pending in self._pending)
+
+    # Queue a compressed frame for key's worker without ever blocking the
+    # caller. payload is copied, so the caller may reuse its buffer at once.
+    # Returns False if the frame was dropped.
+    def submit(self, key, payload, token):
+        if self._closed:
+            raise RuntimeError("ProcessPosePool is closed")
+        index = key % len(self._rings)
+        with self._locks[index]:
+            offset = None
+            if len(self._pending[index]) < self.queue_size:
+                offset = self._rings[index].write(payload)
+            if offset is not None:
+                # Under the lock, so tasks and tokens stay in the same order
+                self._pending[index].append(token)
+                self._tasks[index].put((key, offset, len(payload)))
+                return True
+        with self._lock:
+            self.dropped += 1
+        if self._on_drop is not None:
+            self._on_drop(token)
+        return False
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is _STOP:
+                return
+            index, result = message
+            lock, ring = self._locks[index], self._rings[index]
+            with lock:
+                token = self._pending[index].popleft()
+                payload = ring.oldest()
+            try:
+                self._on_result(token, result, payload)
+            except Exception as e:
+                print(e)
+            finally:
+                payload.release()
+                with lock:
+                    ring.release()
+
+    # Let workers finish the frames they have, then stop them
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(_STOP)
+        for process in self._processes:
+            process.join()
+        if hasattr(self, "_collector"):
+            # Workers have exited, so every result is already in the queue
+            self._results.put(_STOP)
+            self._collector.join()
+        for ring in self._rings:
+            ring.close()
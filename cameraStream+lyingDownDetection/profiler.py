@@ -0,0 +1,65 @@
+import collections
+import os
+import sys
+import threading
+
+# Sampling profiler that can stay attached to a running client: a background
+# thread grabs every other thread's stack interval seconds apart and counts
+# them. Overhead scales with the sampling rate, not with how much code runs,
+# so the pipeline itself is not slowed down the way cProfile would. It
+# samples wall-clock time: threads blocked on a socket or queue count too,
+# which shows where frames wait as well as where CPU goes.
+# Stacks are written in the collapsed "frame;frame;frame count" format read
+# by flamegraph.pl and speedscope.
+class SamplingProfiler:
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    # Share of samples in which each function was running, innermost frame only
+    def top(self, n=10):
+        functions = collections.Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(";", 1)[-1]] += count
+        total = sum(functions.values()) or 1
+        return [(function, count / total) for function, count in functions.most_common(n)]
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,89 @@
+import struct
+import time
+
+# Every frame on the wire is a 4-byte big-endian length followed by the JPEG bytes
+HEADER = struct.Struct(">I")
+# Refuse anything larger than this; a bogus header would otherwise make us
+# allocate gigabytes
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+# Flow control: the client acknowledges every frame it has consumed with a
+# 4-byte count, which gives the sender a credit back
+ACK = struct.Struct(">I")
+
+
+# Write one length-prefixed frame to anything with a write() method, such as
+# an asyncio StreamWriter or a recording file; the caller drains or flushes
+def write_frame(writer, payload):
+    writer.write(HEADER.pack(len(payload)))
+    writer.write(payload)
+
+
+# Acknowledge count consumed frames
+def send_ack(conn, count=1):
+    conn.sendall(ACK.pack(count))
+
+
+# Reads length-prefixed frames into one reusable buffer with recv_into, so a
+# frame costs no per-packet allocations or copies. recv_frame() returns a
+# memoryview into that buffer which is only valid until the next call.
+# With send_acks, each call first acknowledges the previous frame so the
+# sender knows it has been consumed. header_at is the time.monotonic() at
+# which the last frame's header arrived, so the time spent receiving a frame
+# can be told apart from the time spent waiting for it.
+class FrameReceiver:
+    def __init__(self, sock, initial_size=1 << 20, send_acks=False):
+        self._sock = sock
+        self._send_acks = send_acks
+        self._unacked = 0
+        self._header = bytearray(HEADER.size)
+        self.header_at = None
+        self._buffer = bytearray(initial_size)
+
+    # Fill view completely; False if the peer closed the connection first
+    def _recv_exact(self, view):
+        while view:
+            received = self._sock.recv_into(view)
+            if not received:
+                return False
+            view = view[received:]
+        return True
+
+    # Return the next frame payload, or None once the connection is closed
+    def recv_frame(self):
+        if self._unacked:
+            send_ack(self._sock, self._unacked)
+            self._unacked = 0
+        # The header can arrive split across several reads too
+        if not self._recv_exact(memoryview(self._header)):
+            return None
+        self.header_at = time.monotonic()
+        (frame_size,) = HEADER.unpack(self._header)
+        if frame_size > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame size {frame_size} exceeds limit of {MAX_FRAME_SIZE} bytes")
+        if frame_size > len(self._buffer):
+            # Grow geometrically so a slowly increasing frame size doesn't
+            # reallocate on every frame
+            self._buffer = bytearray(max(frame_size, 2 * len(self._buffer)))
+        view = memoryview(self._buffer)[:frame_size]
+        if not self._recv_exact(view):
+            return None
+        if self._send_acks:
+            self._unacked = 1
+        return view
+
+
+# Sender-side view of the ack stream: how many frames are still in flight.
+# credits caps the frames in flight; 0 disables the cap.
+class CreditWindow:
+    def __init__(self, credits=0):
+        self.credits = credits
+        self.in_flight = 0
+
+    def ack(self, count=1):
+        self.in_flight = max(0, self.in_flight - count)
+
+    def can_send(self):
+        return self.credits <= 0 or self.in_flight < self.credits
+
+    def sent(self):
+        self.in_flight += 1
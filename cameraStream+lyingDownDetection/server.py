@@ -1,51 +1,277 @@
-import socket
-from PIL import Image
-import io
+import argparse
+import asyncio
+import threading
+import time
 import cv2
-import struct
-
-# Open the camera
-cam = cv2.VideoCapture(0)
-frame_width = int(cam.get(cv2.CAP_PROP_FRAME_WIDTH))
-frame_height = int(cam.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-def sendCameraStream(conn):
-    while True:
-        ret, frame = cam.read()
-        
-        if not ret:
-            print("Failed to grab frame")
-            break
-
-        # Display the captured frame
-        cv2.imshow('Camera', frame)
-
-        # Press 'q' to exit the loop
-        if cv2.waitKey(1) == ord('q'):
-            break
-        
-        # Encode the frame as JPEG
-        _, buffer = cv2.imencode('.jpg', frame)
-        
-        # Get the size of the buffer
-        buffer_size = len(buffer)
-        
-        # Send the size of the buffer first (as a 4-byte integer)
-        conn.sendall(struct.pack(">I", buffer_size))
-        
-        # Send the actual image data
-        conn.sendall(buffer)
-
-    cam.release()
-    cv2.destroyAllWindows()
-
-# Create a socket and listen for incoming connections
-with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    s.bind(('localhost', 12345))
-    s.listen(1)
-    print("Waiting for a connection...")
-    
-    conn, addr = s.accept()
-    with conn:
-        print(f"Connected by {addr}")
-        sendCameraStream(conn)
+from protocol import ACK, CreditWindow, write_frame
+from sources import open_source
+
+
+# JPEG encoder whose quality follows consumer lag: it backs off quickly while
+# the client has many frames in flight and recovers slowly once it keeps up
+class AdaptiveEncoder:
+    def __init__(self, quality=80, min_quality=30, scale=1.0, step=10):
+        self.max_quality = quality
+        self.min_quality = min(min_quality, quality)
+        self.quality = quality
+        self.scale = scale
+        self.step = step
+
+    def encode(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer
+
+    def update(self, in_flight, credits):
+        if credits <= 0:
+            return
+        if in_flight * 4 >= credits * 3:
+            self.quality = max(self.min_quality, self.quality - self.step)
+        elif in_flight * 4 <= credits:
+            self.quality = min(self.max_quality, self.quality + 1)
+
+
+# One camera source. A capture thread grabs frames, encodes each one once and
+# hands the JPEG bytes to the event loop, which offers them to every subscriber.
+class CameraFeed:
+    def __init__(self, name, source, encoder, fps=0, credits=0):
+        self.name = name
+        self.source = source
+        self.encoder = encoder
+        self.credits = credits
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.subscribers = set()
+        self.latest = None  # last raw frame, for the preview window
+        self.frames_encoded = 0
+        self.done = None
+        self._loop = None
+        self._stop = threading.Event()
+
+    def start(self, loop):
+        self._loop = loop
+        self.done = asyncio.Event()
+        threading.Thread(target=self._capture, name=f"capture-{self.name}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _capture(self):
+        next_send = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                # grab() alone is cheap; only frames we actually send get
+                # retrieved and encoded, and the driver never builds up a
+                # backlog of stale frames
+                if not self.source.grab():
+                    print(f"{self.name}: failed to grab frame")
+                    break
+                now = time.monotonic()
+                if now < next_send:
+                    continue
+                next_send = max(next_send + self.interval, now)
+
+                ret, frame = self.source.retrieve()
+                if not ret:
+                    print(f"{self.name}: failed to grab frame")
+                    break
+                # Replayed recordings are JPEG already and go out as they are
+                if getattr(self.source, "encoded", False):
+                    if self.subscribers:
+                        self._loop.call_soon_threadsafe(self._publish, frame)
+                    continue
+                self.latest = frame
+                # Nobody watching: don't spend CPU on encoding
+                if not self.subscribers:
+                    continue
+                payload = self.encoder.encode(frame).tobytes()
+                self.frames_encoded += 1
+                self._loop.call_soon_threadsafe(self._publish, payload)
+        finally:
+            self.source.release()
+            self._loop.call_soon_threadsafe(self.done.set)
+
+    def _publish(self, payload):
+        for subscriber in self.subscribers:
+            subscriber.offer(payload)
+        # Only turn quality down when every viewer is behind (e.g. the uplink
+        # is saturated); a single slow viewer just gets fewer frames
+        if self.subscribers:
+            lag = min(subscriber.window.in_flight for subscriber in self.subscribers)
+            self.encoder.update(lag, self.credits)
+
+
+# One connected viewer of a feed. Frames wait in a small per-subscriber queue;
+# when it is full the oldest frame is dropped, so a slow viewer only ever
+# loses its own frames and never holds up capture or the other viewers.
+class Subscriber:
+    def __init__(self, reader, writer, credits=0, queue_size=2):
+        self.reader = reader
+        self.writer = writer
+        self.window = CreditWindow(credits=credits)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._acked = asyncio.Event()
+
+    def offer(self, payload):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(payload)
+
+    async def read_acks(self):
+        while True:
+            data = await self.reader.readexactly(ACK.size)
+            self.window.ack(ACK.unpack(data)[0])
+            self._acked.set()
+
+    async def send_frames(self):
+        while True:
+            # Wait for credit before taking a frame, so what we send is the
+            # newest one queued rather than whatever was current when we stalled
+            while not self.window.can_send():
+                self._acked.clear()
+                await self._acked.wait()
+            payload = await self.queue.get()
+            # Send the size of the buffer (as a 4-byte integer) followed by the image data
+            write_frame(self.writer, payload)
+            await self.writer.drain()
+            self.window.sent()
+
+
+# Serve one client connection until it disconnects or the feed ends
+async def sendCameraStream(feed, reader, writer):
+    addr = writer.get_extra_info("peername")
+    print(f"{feed.name}: connected by {addr}")
+    subscriber = Subscriber(reader, writer, credits=feed.credits)
+    feed.subscribers.add(subscriber)
+    tasks = [
+        asyncio.create_task(subscriber.read_acks()),
+        asyncio.create_task(subscriber.send_frames()),
+        asyncio.create_task(feed.done.wait()),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        feed.subscribers.discard(subscriber)
+        for task in tasks:
+            task.cancel()
+        writer.close()
+        print(f"{feed.name}: {addr} disconnected, {subscriber.dropped} frames dropped for it")
+
+
+# Show the latest frame of every feed until 'q' is pressed or done is set.
+# Runs on the main thread: HighGUI isn't thread-safe, and macOS only allows
+# windows on the main thread. Sending runs on the event loop's own thread,
+# so a slow GUI never stalls it.
+def preview(feeds, done):
+    shown = {}
+    try:
+        while not done.is_set():
+            for feed in list(feeds):
+                frame = feed.latest
+                if frame is not None and shown.get(feed.name) is not frame:
+                    cv2.imshow(feed.name, frame)
+                    shown[feed.name] = frame
+            if cv2.waitKey(30) == ord('q'):
+                return
+    finally:
+        cv2.destroyAllWindows()
+
+
+async def _wait_for(event, interval=0.1):
+    while not event.is_set():
+        await asyncio.sleep(interval)
+
+
+# Serve every source, appending its feed to feeds, until they have all ended
+# or stop is set from another thread; done is set once serving has stopped
+async def serve(args, feeds, stop, done):
+    loop = asyncio.get_running_loop()
+    servers = []
+    try:
+        # Each source gets its own port, counting up from --port
+        for index, spec in enumerate(args.source):
+            encoder = AdaptiveEncoder(quality=args.quality, min_quality=args.min_quality, scale=args.scale)
+            feed = CameraFeed(f"Camera {index}", open_source(spec, loop=args.loop), encoder,
+                              fps=args.fps, credits=args.credits)
+            feed.start(loop)
+            feeds.append(feed)
+            port = args.port + index
+            servers.append(await asyncio.start_server(
+                lambda reader, writer, feed=feed: sendCameraStream(feed, reader, writer), args.host, port))
+            print(f"{feed.name} ({spec}) waiting for connections on {args.host}:{port}")
+
+        waiters = [asyncio.create_task(feed.done.wait()) for feed in feeds]
+        watched = [asyncio.create_task(asyncio.wait(waiters)), asyncio.create_task(_wait_for(stop))]
+        await asyncio.wait(watched, return_when=asyncio.FIRST_COMPLETED)
+        for task in watched:
+            task.cancel()
+    finally:
+        for feed in feeds:
+            feed.stop()
+        for server in servers:
+            server.close()
+        # Keep the loop up until every capture thread has signalled it
+        try:
+            await asyncio.wait_for(asyncio.gather(*(feed.done.wait() for feed in feeds)), timeout=5)
+        finally:
+            done.set()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream one or more cameras to client.py")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345, help="Port of the first source; later sources count up")
+    parser.add_argument("--source", action="append",
+                        help="Camera index, video file, synthetic[:WxH][@FPS] or replay:RECORDING[@FPS]; "
+                             "repeat for several (default: 0)")
+    parser.add_argument("--loop", action="store_true", help="Restart video file and replay sources when they end")
+    parser.add_argument("--fps", type=float, default=0, help="Target frames per second sent (0: source rate)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Resize factor applied before encoding")
+    parser.add_argument("--quality", type=int, default=80, help="Starting and maximum JPEG quality")
+    parser.add_argument("--min-quality", type=int, default=30, help="Lowest JPEG quality used when clients lag")
+    parser.add_argument("--credits", type=int, default=4,
+                        help="Frames allowed in flight per client before waiting for acks (0: no flow control)")
+    parser.add_argument("--headless", action="store_true", help="Don't open preview windows")
+    args = parser.parse_args()
+    args.source = args.source or ["0"]
+    return args
+
+
+def main():
+    args = parse_args()
+    feeds = []
+    stop = threading.Event()
+    done = threading.Event()
+    errors = []
+
+    def run_loop():
+        try:
+            asyncio.run(serve(args, feeds, stop, done))
+        except Exception as e:
+            errors.append(e)
+            done.set()
+
+    # The event loop gets a background thread; the main thread is left for
+    # the preview window, or just waits when headless
+    thread = threading.Thread(target=run_loop, name="server-loop", daemon=True)
+    thread.start()
+    try:
+        if args.headless:
+            while not done.wait(0.5):
+                pass
+        else:
+            preview(feeds, done)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        thread.join()
+    # Report a failure to start, such as a port in use, from the main thread
+    if errors:
+        raise errors[0]
+
+
+if __name__ == '__main__':
+    main()
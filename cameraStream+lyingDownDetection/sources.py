@@ -0,0 +1,170 @@
+import re
+import time
+import cv2
+import numpy as np
+from protocol import HEADER, write_frame
+
+# Frame sources for server.py. Besides a real webcam, a video file or a
+# synthetic test pattern can stand in for the camera; all of them offer the
+# subset of the cv2.VideoCapture API the server uses: grab(), retrieve(),
+# read() and release(). A source with encoded = True hands out JPEG bytes
+# from retrieve(), which the server sends without re-encoding.
+
+
+# Sleeps so that successive calls to wait() are at most fps apart
+class Pacer:
+    def __init__(self, fps):
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._next = None
+
+    def wait(self):
+        now = time.monotonic()
+        if self._next is not None and self._next > now:
+            time.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+# Moving box and frame counter on a grey background; frames=None runs forever
+class SyntheticSource:
+    def __init__(self, width=640, height=480, fps=30, frames=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames
+        self.index = -1
+        self._pacer = Pacer(fps)
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.frames is not None and self.index + 1 >= self.frames:
+            return False
+        self._pacer.wait()
+        self.index += 1
+        return True
+
+    def retrieve(self):
+        frame = np.full((self.height, self.width, 3), 96, dtype=np.uint8)
+        size = max(self.height // 4, 1)
+        x = (self.index * 8) % max(self.width - size, 1)
+        y = (self.height - size) // 2
+        cv2.rectangle(frame, (x, y), (x + size, y + size), (0, 200, 255), -1)
+        cv2.putText(frame, str(self.index), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2, cv2.LINE_AA)
+        return True, frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+# Plays a recorded video at its own frame rate (or fps, if given), optionally looping
+class FileSource:
+    def __init__(self, path, fps=None, loop=False):
+        self.path = path
+        self.loop = loop
+        self._cap = cv2.VideoCapture(path)
+        self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30
+        self._pacer = Pacer(self.fps)
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def grab(self):
+        self._pacer.wait()
+        if self._cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self._cap.grab()
+
+    def retrieve(self):
+        return self._cap.retrieve()
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        self._cap.release()
+
+
+# Recordings store frames exactly as they go over the wire: a 4-byte
+# big-endian length, then the JPEG bytes
+def write_recording(path, payloads):
+    with open(path, "wb") as f:
+        for payload in payloads:
+            write_frame(f, payload)
+
+
+def read_recording(path):
+    payloads = []
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return payloads
+            (size,) = HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                return payloads
+            payloads.append(payload)
+
+
+# Replays already-encoded frames (say, from read_recording) at a fixed rate,
+# optionally looping, so every run sends byte-identical input and the sender
+# spends no time encoding
+class ReplaySource:
+    encoded = True
+
+    def __init__(self, payloads, fps=30, loop=False):
+        self.payloads = payloads
+        self.fps = fps
+        self.loop = loop
+        self.index = -1
+        self._pacer = Pacer(fps)
+
+    def isOpened(self):
+        return bool(self.payloads)
+
+    def grab(self):
+        if self.index + 1 >= len(self.payloads) and not (self.loop and self.payloads):
+            return False
+        self._pacer.wait()
+        self.index += 1
+        return True
+
+    def retrieve(self):
+        return True, self.payloads[self.index % len(self.payloads)]
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+# Turn a --source value into a source: a camera index ("0"), "synthetic" with
+# an optional "synthetic:WIDTHxHEIGHT@FPS" spec, "replay:PATH[@FPS]" for a
+# recording, or a path to a video file
+def open_source(spec, loop=False):
+    if spec.isdigit():
+        return cv2.VideoCapture(int(spec))
+    match = re.fullmatch(r"replay:(.+?)(?:@(\d+(?:\.\d+)?))?", spec)
+    if match:
+        path, fps = match.groups()
+        return ReplaySource(read_recording(path), float(fps or 30), loop=loop)
+    match = re.fullmatch(r"synthetic(?::(\d+)x(\d+))?(?:@(\d+(?:\.\d+)?))?", spec)
+    if match:
+        width, height, fps = match.groups()
+        return SyntheticSource(int(width or 640), int(height or 480), float(fps or 30))
+    return FileSource(spec, loop=loop)
@@ -0,0 +1,448 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "medical_data.db")
+
+# Tables for medical data, notifications, medications, and emergency contacts,
+# and the indexes the dashboard's filtered, paginated queries rely on
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS medical_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        age INTEGER NOT NULL,
+        blood_pressure TEXT NOT NULL,
+        heart_rate INTEGER NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        abnormal_data TEXT NOT NULL,
+        abnormal_type TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS medications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_name TEXT NOT NULL,
+        medication_name TEXT NOT NULL,
+        dosage TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS emergency_contacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        relationship TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Per-patient history and newest-first listings, plus time-range filters
+    # across all patients
+    "CREATE INDEX IF NOT EXISTS idx_medical_data_name_timestamp ON medical_data (name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_medical_data_timestamp ON medical_data (timestamp)",
+    # Rows added to one patient's history since a given id, for incremental
+    # chart refreshes
+    "CREATE INDEX IF NOT EXISTS idx_medical_data_name_id ON medical_data (name, id)",
+    "CREATE INDEX IF NOT EXISTS idx_notifications_name_timestamp ON notifications (name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_notifications_timestamp ON notifications (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_medications_patient_name_timestamp ON medications (patient_name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_medications_timestamp ON medications (timestamp)",
+]
+
+
+# Open a connection that may be handed between threads (the pool makes sure
+# only one thread uses it at a time)
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    # WAL lets readers and the writer work at the same time; NORMAL sync is
+    # safe with WAL and avoids an fsync on every commit
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+# Schema changes for databases created by older versions, applied in order.
+# PRAGMA user_version records how many have run, so each runs exactly once.
+def _add_blood_pressure_columns(conn):
+    # Store blood pressure as numbers instead of re-parsing "120/80" on
+    # every read; the text column stays for older readers
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(medical_data)")}
+    for column in ("systolic", "diastolic"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE medical_data ADD COLUMN {column} INTEGER")
+    conn.execute("""
+        UPDATE medical_data
+        SET systolic = CAST(substr(blood_pressure, 1, instr(blood_pressure, '/') - 1) AS INTEGER),
+            diastolic = CAST(substr(blood_pressure, instr(blood_pressure, '/') + 1) AS INTEGER)
+        WHERE systolic IS NULL AND instr(blood_pressure, '/') > 0
+    """)
+
+def _add_vital_rules(conn):
+    # Alert thresholds, optionally per patient or age band (NULL means any).
+    # "range" rules flag readings outside [low, high]; "rate" rules flag a
+    # change from the patient's previous reading, if it was taken within
+    # window_minutes, outside [low, high].
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vital_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_name TEXT,
+            age_min INTEGER,
+            age_max INTEGER,
+            metric TEXT NOT NULL CHECK (metric IN ('heart_rate', 'systolic', 'diastolic')),
+            kind TEXT NOT NULL DEFAULT 'range' CHECK (kind IN ('range', 'rate')),
+            low REAL,
+            high REAL,
+            window_minutes REAL,
+            abnormal_type TEXT NOT NULL,
+            enabled INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    # The thresholds detect_abnormal_data used to hard-code, plus a sudden
+    # heart rate change rule
+    conn.executemany("""
+        INSERT INTO vital_rules (metric, kind, low, high, window_minutes, abnormal_type)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        ("heart_rate", "range", 60, 100, None, "Heart Rate"),
+        ("systolic", "range", None, 140, None, "Blood Pressure"),
+        ("diastolic", "range", None, 90, None, "Blood Pressure"),
+        ("heart_rate", "rate", -30, 30, 10, "Heart Rate Change"),
+    ])
+
+def _add_patient_locations(conn):
+    # Where each patient is, for the nearest-hospital map
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS patient_locations (
+            name TEXT PRIMARY KEY,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+# Per-patient rollups of the vitals for long-range charts, keyed by the start
+# of each bucket. Timestamps are stored as "YYYY-MM-DD HH:MM:SS", so buckets
+# are prefixes of them.
+ROLLUPS = {
+    "vitals_hourly": "substr({timestamp}, 1, 13) || ':00:00'",
+    "vitals_daily": "substr({timestamp}, 1, 10)",
+}
+ROLLUP_METRICS = ["heart_rate", "systolic", "diastolic"]
+
+# SQL fragments shared by the rollup triggers and bulk updates: the
+# aggregates of a group of readings, and merging them into an existing bucket
+_ROLLUP_AGGREGATES = ", ".join(f"min({m}), max({m}), total({m}), count({m})" for m in ROLLUP_METRICS)
+_ROLLUP_MERGE = ", ".join(
+    f"{m}_min = coalesce(min({m}_min, excluded.{m}_min), {m}_min, excluded.{m}_min), "
+    f"{m}_max = coalesce(max({m}_max, excluded.{m}_max), {m}_max, excluded.{m}_max), "
+    f"{m}_sum = {m}_sum + excluded.{m}_sum, {m}_count = {m}_count + excluded.{m}_count"
+    for m in ROLLUP_METRICS)
+
+# Trigger that adds each inserted reading to one rollup table
+def _rollup_trigger(table, bucket):
+    values = ", ".join(f"NEW.{m}, NEW.{m}, coalesce(NEW.{m}, 0), NEW.{m} IS NOT NULL" for m in ROLLUP_METRICS)
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON medical_data
+        BEGIN
+            INSERT INTO {table} VALUES (NEW.name, {bucket.format(timestamp="NEW.timestamp")}, 1, {values})
+            ON CONFLICT (name, bucket) DO UPDATE SET readings = readings + 1, {_ROLLUP_MERGE};
+        END
+    """
+
+# Recompute every rollup from medical_data
+def rebuild_rollups(conn):
+    for table, bucket in ROLLUPS.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT name, {bucket.format(timestamp="timestamp")} AS bucket, count(*), {_ROLLUP_AGGREGATES}
+            FROM medical_data GROUP BY name, bucket
+        """)
+
+def _add_vitals_rollups(conn):
+    # min/max/sum/count per metric; means are sum / count when read. Sums
+    # and counts skip missing values, as SQL's aggregates do.
+    columns = ", ".join(f"{m}_min REAL, {m}_max REAL, {m}_sum REAL NOT NULL, {m}_count INTEGER NOT NULL"
+                        for m in ROLLUP_METRICS)
+    for table, bucket in ROLLUPS.items():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                name TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                readings INTEGER NOT NULL,
+                {columns},
+                PRIMARY KEY (name, bucket)
+            ) WITHOUT ROWID
+        """)
+        # Kept up to date as readings are inserted; the dashboard never
+        # updates or deletes readings (run rebuild_rollups if anything does)
+        conn.execute(_rollup_trigger(table, bucket))
+    rebuild_rollups(conn)
+
+# Bulk inserts into medical_data without the per-row rollup triggers, which
+# would otherwise halve their speed: inside the block the triggers are
+# dropped, and afterwards the new readings are added to each rollup with one
+# grouped upsert before the triggers are put back. It all happens in one
+# transaction (begun here if none is open; commit it as usual), so other
+# connections never see the triggers missing, and an error rolls everything
+# back, triggers included.
+@contextmanager
+def bulk_rollups(conn):
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    last_id = conn.execute("SELECT coalesce(max(id), 0) FROM medical_data").fetchone()[0]
+    for table in ROLLUPS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_insert")
+    yield
+    for table, bucket in ROLLUPS.items():
+        conn.execute(f"""
+            INSERT INTO {table}
+            SELECT name, {bucket.format(timestamp="timestamp")} AS bucket, count(*), {_ROLLUP_AGGREGATES}
+            FROM medical_data WHERE id > ? GROUP BY name, bucket
+            ON CONFLICT (name, bucket) DO UPDATE SET readings = readings + excluded.readings, {_ROLLUP_MERGE}
+        """, (last_id,))
+        conn.execute(_rollup_trigger(table, bucket))
+
+# Match one logged dose ({new}id, {new}patient_name, {new}medication_name,
+# {new}timestamp) to the scheduled dose it was taken for: the nearest due
+# time of the same patient and medication, not yet taken, that it falls
+# within window_minutes before or late_minutes after. "{new}" is "NEW." in
+# the trigger and ":" for named parameters when rebuilding.
+_MATCH_DOSE = """
+    INSERT INTO dose_intakes (schedule_id, due, medication_id, taken_at, minutes_late)
+    SELECT id, due, {new}id, {new}timestamp, round((julianday({new}timestamp) - julianday(due)) * 1440, 1)
+    FROM (
+        SELECT s.id, datetime(date({new}timestamp, offset || ' days') || ' ' || s.dose_time) AS due,
+               s.window_minutes, s.late_minutes, s.start_date, s.end_date
+        FROM medication_schedules s,
+             (SELECT -1 AS offset UNION ALL SELECT 0 UNION ALL SELECT 1)
+        WHERE s.patient_name = {new}patient_name AND s.medication_name = {new}medication_name
+    ) AS candidate
+    WHERE date(due) >= start_date AND (end_date IS NULL OR date(due) <= end_date)
+      AND {new}timestamp BETWEEN datetime(due, -window_minutes || ' minutes')
+                             AND datetime(due, late_minutes || ' minutes')
+      AND NOT EXISTS (SELECT 1 FROM dose_intakes i WHERE i.schedule_id = candidate.id AND i.due = candidate.due)
+    ORDER BY abs(julianday({new}timestamp) - julianday(due))
+    LIMIT 1
+"""
+
+# Recompute which logged doses count for which scheduled ones, for one
+# patient and medication or for everything, replaying the log in time order
+# so earlier doses claim their slots first. Run after changing a schedule.
+def rebuild_adherence(conn, patient_name=None, medication_name=None):
+    where = ""
+    params = {}
+    if patient_name is not None:
+        where = " WHERE patient_name = :patient_name AND medication_name = :medication_name"
+        params = {"patient_name": patient_name, "medication_name": medication_name}
+    conn.execute(f"""
+        DELETE FROM dose_intakes WHERE schedule_id IN (SELECT id FROM medication_schedules{where})
+    """, params)
+    doses = conn.execute(f"""
+        SELECT id, patient_name, medication_name, timestamp FROM medications{where} ORDER BY timestamp, id
+    """, params).fetchall()
+    conn.executemany(_MATCH_DOSE.format(new=":"), [
+        {"id": id, "patient_name": patient, "medication_name": medication, "timestamp": timestamp}
+        for id, patient, medication, timestamp in doses
+    ])
+
+# Recompute the per-day dose totals from medications
+def rebuild_medication_daily(conn):
+    conn.execute("DELETE FROM medication_daily")
+    conn.execute("""
+        INSERT INTO medication_daily
+        SELECT patient_name, medication_name, substr(timestamp, 1, 10), coalesce(dose_unit, ''),
+               count(*), total(dose_amount)
+        FROM medications GROUP BY 1, 2, 3, 4
+    """)
+
+def _add_medication_schedules(conn):
+    # Doses as a number and a unit; the free-text dosage stays for older
+    # readers. Existing "100 mg"-style entries are split up; SQLite's CAST
+    # reads the leading number and ltrim strips it off to leave the unit.
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(medications)")}
+    if "dose_amount" not in columns:
+        conn.execute("ALTER TABLE medications ADD COLUMN dose_amount REAL")
+    if "dose_unit" not in columns:
+        conn.execute("ALTER TABLE medications ADD COLUMN dose_unit TEXT")
+    conn.execute("""
+        UPDATE medications
+        SET dose_amount = CAST(trim(dosage) AS REAL),
+            dose_unit = nullif(trim(ltrim(trim(dosage), '0123456789.')), '')
+        WHERE dose_amount IS NULL AND (trim(dosage) GLOB '[0-9]*' OR trim(dosage) GLOB '.[0-9]*')
+    """)
+    # One row per daily dose time of a patient's medication, e.g. two rows
+    # for 08:00 and 20:00. Times are on the same clock as the stored
+    # timestamps (UTC). A dose logged up to window_minutes either side of
+    # the time is on time, up to late_minutes after it late; none is missed.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS medication_schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_name TEXT NOT NULL,
+            medication_name TEXT NOT NULL,
+            dose_time TEXT NOT NULL,
+            dose_amount REAL,
+            dose_unit TEXT,
+            start_date TEXT NOT NULL DEFAULT (date('now')),
+            end_date TEXT,
+            window_minutes REAL NOT NULL DEFAULT 60,
+            late_minutes REAL NOT NULL DEFAULT 240
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_medication_schedules_patient_medication
+        ON medication_schedules (patient_name, medication_name)
+    """)
+    # Scheduled doses that were taken, and by which logged dose. Missed doses
+    # are the scheduled ones with no row here, so nothing has to be written
+    # as time passes.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dose_intakes (
+            schedule_id INTEGER NOT NULL,
+            due TEXT NOT NULL,
+            medication_id INTEGER NOT NULL,
+            taken_at TEXT NOT NULL,
+            minutes_late REAL NOT NULL,
+            PRIMARY KEY (schedule_id, due)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS dose_intakes_insert AFTER INSERT ON medications
+        BEGIN
+            {_MATCH_DOSE.format(new="NEW.")};
+        END
+    """)
+    # Doses and total amount per patient, medication, day and unit, kept up
+    # to date the same way as the vitals rollups
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS medication_daily (
+            patient_name TEXT NOT NULL,
+            medication_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            dose_unit TEXT NOT NULL,
+            doses INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            PRIMARY KEY (patient_name, medication_name, day, dose_unit)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS medication_daily_insert AFTER INSERT ON medications
+        BEGIN
+            INSERT INTO medication_daily VALUES (NEW.patient_name, NEW.medication_name, substr(NEW.timestamp, 1, 10),
+                                                 coalesce(NEW.dose_unit, ''), 1, coalesce(NEW.dose_amount, 0))
+            ON CONFLICT (patient_name, medication_name, day, dose_unit)
+            DO UPDATE SET doses = doses + 1, total_amount = total_amount + excluded.total_amount;
+        END
+    """)
+    rebuild_medication_daily(conn)
+
+def _add_schedule_delete_trigger(conn):
+    # A scheduled dose that no longer exists can't have been taken; without
+    # this, replacing a schedule left its intakes behind next to the new ones
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS dose_intakes_schedule_delete AFTER DELETE ON medication_schedules
+        BEGIN
+            DELETE FROM dose_intakes WHERE schedule_id = OLD.id;
+        END
+    """)
+    conn.execute("DELETE FROM dose_intakes WHERE schedule_id NOT IN (SELECT id FROM medication_schedules)")
+
+MIGRATIONS = [
+    _add_blood_pressure_columns,
+    _add_vital_rules,
+    _add_patient_locations,
+    _add_vitals_rollups,
+    _add_medication_schedules,
+    _add_schedule_delete_trigger,
+]
+
+
+# Bring the database up to the current schema
+def migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+
+# Create the tables if they don't exist yet and apply pending migrations
+def init_db(conn):
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    migrate(conn)
+
+
+# Small, thread-safe pool of SQLite connections shared by every session of the
+# process. Connections are opened lazily up to `size`; the schema is set up
+# once, when the pool is created.
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=4):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        conn = connect(path)
+        init_db(conn)
+        self._idle.put(conn)
+        self._opened = 1
+
+    # Borrow a connection for the duration of a with block; waits if all are in
+    # use. A thread that already holds one gets the same connection back, so
+    # nested borrows can't deadlock on a pool they have exhausted themselves.
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._local.conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return connect(self.path)
+        return self._idle.get()
+
+    # Close every idle connection
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# Running this module migrates the database in place
+if __name__ == "__main__":
+    conn = connect()
+    init_db(conn)
+    print(f"{DB_PATH} is at schema version {conn.execute('PRAGMA user_version').fetchone()[0]}")
+    conn.close()
@@ -0,0 +1,55 @@
+import csv
+import os
+import numpy as np
+
+HOSPITALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hospitals.csv")
+EARTH_RADIUS_KM = 6371.0088
+
+
+# Points on the unit sphere for arrays of latitudes and longitudes in degrees
+def unit_vectors(latitudes, longitudes):
+    lat = np.radians(np.asarray(latitudes, dtype="float64"))
+    lon = np.radians(np.asarray(longitudes, dtype="float64"))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+# Great-circle distance in km; arguments broadcast against each other
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# Hospital locations with nearest-facility lookups. Every hospital is kept as
+# a unit vector, so the closest one by great-circle distance is simply the
+# one with the largest dot product: a single matrix product covers any number
+# of patients at once.
+class HospitalIndex:
+    def __init__(self, names, latitudes, longitudes):
+        self.names = list(names)
+        self.latitudes = np.asarray(latitudes, dtype="float64")
+        self.longitudes = np.asarray(longitudes, dtype="float64")
+        self._points = unit_vectors(self.latitudes, self.longitudes)
+
+    # Load a CSV file with name, latitude and longitude columns
+    @classmethod
+    def from_csv(cls, path=HOSPITALS_PATH):
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        return cls([row["name"] for row in rows], [float(row["latitude"]) for row in rows],
+                   [float(row["longitude"]) for row in rows])
+
+    def __len__(self):
+        return len(self.names)
+
+    # Index of the nearest hospital, and its distance in km, for each location
+    def nearest_many(self, latitudes, longitudes):
+        closest = np.argmax(unit_vectors(latitudes, longitudes) @ self._points.T, axis=-1)
+        distances = haversine_km(latitudes, longitudes, self.latitudes[closest], self.longitudes[closest])
+        return closest, distances
+
+    # Nearest hospital to one location as (name, latitude, longitude, distance_km)
+    def nearest(self, latitude, longitude):
+        closest, distance = self.nearest_many(latitude, longitude)
+        i = int(closest)
+        return self.names[i], float(self.latitudes[i]), float(self.longitudes[i]), float(distance)
@@ -0,0 +1,177 @@
+import argparse
+import json
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from db import DB_PATH, bulk_rollups, connect, init_db
+from rules import READING_COLUMNS, load_rules, notification_rows, score
+
+# Fields of a reading; timestamp is optional and defaults to the time of ingest
+FIELDS = ["name", "age", "blood_pressure", "heart_rate", "timestamp"]
+# Same format as SQLite's CURRENT_TIMESTAMP, which the dashboard sorts on
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+AGE_RANGE = (1, 120)
+SYSTOLIC_RANGE = (50, 250)
+DIASTOLIC_RANGE = (30, 150)
+HEART_RATE_RANGE = (30, 200)
+
+
+# True where a string is a whole number within bounds
+def _whole_number(values, bounds):
+    digits = values.str.fullmatch(r"[0-9]+").fillna(False).to_numpy(dtype=bool)
+    return digits & pd.to_numeric(values, errors="coerce").between(*bounds).to_numpy()
+
+
+# Systolic and diastolic parts of "120/80" strings, as columns 0 and 1
+def _split_bp(values):
+    return values.str.extract(r"^([0-9]+)/([0-9]+)$")
+
+
+# Why each reading fails validation, checking fields in the same order as the
+# dashboard's form; an empty string means the reading is valid. Takes a
+# DataFrame of strings with name, age, blood_pressure and heart_rate columns,
+# and optionally their blood pressures already split by _split_bp.
+def validation_errors(readings, bp=None):
+    if bp is None:
+        bp = _split_bp(readings["blood_pressure"])
+    checks = [
+        (readings["name"].str.len().to_numpy() > 0, "Patient name is required."),
+        (_whole_number(readings["age"], AGE_RANGE), "Please enter a valid age (1-120)."),
+        (_whole_number(bp[0], SYSTOLIC_RANGE) & _whole_number(bp[1], DIASTOLIC_RANGE),
+         "Please enter blood pressure in format systolic/diastolic (e.g., 120/80)."),
+        (_whole_number(readings["heart_rate"], HEART_RATE_RANGE), "Please enter a valid heart rate (30-200 bpm)."),
+    ]
+    errors = np.select([~ok for ok, _ in checks], [message for _, message in checks], default="")
+    return pd.Series(errors, index=readings.index, dtype=object)
+
+
+# Validate one reading as entered in the dashboard's form; returns an error
+# message or None
+def validate_reading(name, age, bp, hr):
+    readings = pd.DataFrame([[name, age, bp, hr]], columns=["name", "age", "blood_pressure", "heart_rate"])
+    return validation_errors(readings).iloc[0] or None
+
+
+# Any table of readings (DataFrame, list of dicts) as strings in FIELDS
+# order, with missing values as ""
+def _as_strings(readings):
+    readings = pd.DataFrame(readings).reindex(columns=FIELDS)
+    return readings.where(readings.notna(), "").astype(str).reset_index(drop=True)
+
+
+# Load readings from a CSV or JSON Lines file; "-" reads stdin
+def read_readings(path, format=None):
+    if format is None:
+        format = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    source = sys.stdin if path == "-" else open(path)
+    try:
+        if format == "jsonl":
+            return _as_strings([json.loads(line) for line in source if line.strip()])
+        return _as_strings(pd.read_csv(source, dtype=str, keep_default_na=False))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+# Violations of the current rules within a batch. For rate rules, each
+# patient's latest stored reading up to their first one in the batch is
+# scored along with it, under index labels past the end of the batch.
+def _violations(conn, batch):
+    cursor = conn.cursor()
+    rules = load_rules(cursor)
+    history = []
+    if (rules["kind"] == "rate").any():
+        for name, first in batch.groupby("name")["timestamp"].min().items():
+            cursor.execute(f"""
+                SELECT {', '.join(READING_COLUMNS)} FROM medical_data
+                WHERE name = ? AND timestamp <= ?
+                ORDER BY timestamp DESC LIMIT 1
+            """, (name, first))
+            history += cursor.fetchall()
+    history = pd.DataFrame(history, columns=READING_COLUMNS, index=range(len(batch), len(batch) + len(history)))
+    # History goes first so it sorts before batch readings with the same timestamp
+    readings = pd.concat([history, batch[READING_COLUMNS]]) if len(history) else batch[READING_COLUMNS]
+    violations = score(readings, rules)
+    return readings, violations[violations["reading"] < len(batch)]
+
+
+# Validate and store a batch of readings (a DataFrame or list of dicts with
+# FIELDS), checking the whole batch against the alert rules at once. Rows
+# are inserted chunk_size at a time, each chunk in one transaction with its
+# notifications. Returns the number of readings stored, the notification
+# rows written, and the rejected input rows with an "error" column.
+def ingest(conn, readings, chunk_size=10_000, detect=True):
+    readings = _as_strings(readings)
+    bp = _split_bp(readings["blood_pressure"])
+    errors = validation_errors(readings, bp)
+
+    missing = readings["timestamp"] == ""
+    timestamps = pd.to_datetime(readings["timestamp"].mask(missing), errors="coerce", utc=True, format="ISO8601")
+    errors = errors.mask((errors == "") & ~missing & timestamps.isna(), "Invalid timestamp.")
+    now = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+    timestamps = timestamps.dt.tz_convert(None).dt.strftime(TIMESTAMP_FORMAT).mask(missing, now)
+
+    ok = (errors == "").to_numpy()
+    rejected = readings[~ok].assign(error=errors[~ok])
+    valid = readings[ok]
+    batch = pd.DataFrame({
+        "name": valid["name"].to_numpy(),
+        "age": valid["age"].astype("int64").to_numpy(),
+        "blood_pressure": valid["blood_pressure"].to_numpy(),
+        "systolic": bp.loc[ok, 0].astype("int64").to_numpy(),
+        "diastolic": bp.loc[ok, 1].astype("int64").to_numpy(),
+        "heart_rate": valid["heart_rate"].astype("int64").to_numpy(),
+        "timestamp": timestamps[ok].to_numpy(),
+    })
+
+    if detect and len(batch):
+        scored, violations = _violations(conn, batch)
+    else:
+        scored, violations = batch, pd.DataFrame(columns=["reading", "abnormal_type", "abnormal_data"])
+
+    # tolist() turns numpy scalars into Python values sqlite3 can bind
+    rows = list(zip(*(batch[column].tolist() for column in
+                      ["name", "age", "blood_pressure", "systolic", "diastolic", "heart_rate", "timestamp"])))
+    notifications = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = violations[(violations["reading"] >= start) & (violations["reading"] < start + chunk_size)]
+        chunk_notifications = notification_rows(scored, chunk)
+        with conn, bulk_rollups(conn):
+            conn.executemany("""
+                INSERT INTO medical_data (name, age, blood_pressure, systolic, diastolic, heart_rate, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, rows[start:start + chunk_size])
+            conn.executemany("""
+                INSERT INTO notifications (name, abnormal_data, abnormal_type, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, chunk_notifications)
+        notifications += chunk_notifications
+    return len(rows), notifications, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load vitals readings into the dashboard's database")
+    parser.add_argument("path", help="CSV or JSON Lines file of readings, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Input format (default: from the file extension, else csv)")
+    parser.add_argument("--db", default=DB_PATH, help="Database to load into")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Readings per transaction")
+    parser.add_argument("--no-detect", action="store_true", help="Skip checking readings against the alert rules")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    init_db(conn)
+    readings = read_readings(args.path, args.format)
+    stored, notifications, rejected = ingest(conn, readings, chunk_size=args.chunk_size, detect=not args.no_detect)
+    conn.close()
+    print(f"Stored {stored} readings, wrote {len(notifications)} notifications, rejected {len(rejected)}.")
+    for line, row in rejected.head(20).iterrows():
+        print(f"  row {line + 1}: {row['error']}", file=sys.stderr)
+    if len(rejected) > 20:
+        print(f"  ... and {len(rejected) - 20} more", file=sys.stderr)
+    return 1 if len(rejected) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from db import connect, init_db, rebuild_adherence
+
+# Units offered for dose amounts
+DOSE_UNITS = ["mg", "mcg", "g", "mL", "units", "tablets", "capsules", "drops", "puffs"]
+# Same format as SQLite's CURRENT_TIMESTAMP, which medications are stored in
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DOSE_COLUMNS = ["Patient", "Medication", "Amount", "Unit", "Due", "Taken", "Minutes Late", "Status"]
+REPORT_COLUMNS = ["Patient", "Medication", "Scheduled", "On Time", "Late", "Missed", "Adherence %",
+                  "Avg Minutes Late"]
+DAILY_COLUMNS = ["Day", "Medication", "Unit", "Doses", "Total"]
+
+# Every scheduled dose due in [:start, :end), with the logged dose that
+# covered it, if any. Due times are generated from the schedules one day at
+# a time and joined to dose_intakes on its primary key, so the cost grows
+# with the doses in range, not with the size of the log. A dose is pending
+# until its late window has passed at :now.
+_DOSES_DUE = """
+    WITH RECURSIVE days(day) AS (
+        SELECT date(:start)
+        UNION ALL
+        SELECT date(day, '+1 day') FROM days WHERE day < date(:end)
+    ),
+    scheduled AS (
+        SELECT s.*, datetime(days.day || ' ' || s.dose_time) AS due
+        FROM medication_schedules s
+        JOIN days ON days.day >= s.start_date AND (s.end_date IS NULL OR days.day <= s.end_date)
+        {where}
+    )
+    SELECT scheduled.patient_name, scheduled.medication_name, scheduled.dose_amount, scheduled.dose_unit,
+           scheduled.due, i.taken_at, i.minutes_late,
+           CASE
+               WHEN i.taken_at IS NOT NULL AND i.minutes_late <= scheduled.window_minutes THEN 'on time'
+               WHEN i.taken_at IS NOT NULL THEN 'late'
+               WHEN datetime(scheduled.due, scheduled.late_minutes || ' minutes') > :now THEN 'pending'
+               ELSE 'missed'
+           END AS status
+    FROM scheduled
+    LEFT JOIN dose_intakes i ON i.schedule_id = scheduled.id AND i.due = scheduled.due
+    WHERE scheduled.due >= :start AND scheduled.due < :end
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+# Named parameters for _DOSES_DUE; start and end are dates or timestamps
+def _range(start, end, now=None, **params):
+    return {"start": str(start), "end": str(end), "now": now or _now(), **params}
+
+
+# "8:00, 20:00" -> ["08:00", "20:00"]; raises ValueError on anything that
+# isn't a list of HH:MM times. An empty string is an empty list.
+def parse_dose_times(text):
+    times = {datetime.strptime(part.strip(), "%H:%M").strftime("%H:%M")
+             for part in text.replace(";", ",").split(",") if part.strip()}
+    return sorted(times)
+
+
+# Log one dose; the free-text dosage is filled in too, for older readers.
+# Triggers match it to the scheduled dose it was taken for and add it to the
+# day's totals.
+def log_dose(conn, patient_name, medication_name, amount, unit, timestamp=None):
+    with conn:
+        conn.execute("""
+            INSERT INTO medications (patient_name, medication_name, dosage, dose_amount, dose_unit, timestamp)
+            VALUES (?, ?, ?, ?, ?, coalesce(?, CURRENT_TIMESTAMP))
+        """, (patient_name, medication_name, f"{amount:g} {unit}", amount, unit, timestamp))
+
+
+# Schedule a patient's medication at dose_times ("HH:MM") every day from
+# start_date (default today) to end_date (inclusive; None means ongoing).
+# The previous schedule still applies to days before start_date, so past
+# adherence doesn't change; with no dose_times the medication just stops
+# being scheduled from start_date. Doses already logged are then matched
+# against the new schedule.
+def set_schedule(conn, patient_name, medication_name, dose_times, amount=None, unit=None, start_date=None,
+                 end_date=None, window_minutes=60, late_minutes=240):
+    start_date = (start_date or datetime.now(timezone.utc).date()).isoformat()
+    end_date = end_date.isoformat() if end_date else None
+    pair = (patient_name, medication_name)
+    with conn:
+        conn.execute("""
+            DELETE FROM medication_schedules WHERE patient_name = ? AND medication_name = ? AND start_date >= ?
+        """, pair + (start_date,))
+        conn.execute("""
+            UPDATE medication_schedules SET end_date = date(?, '-1 day')
+            WHERE patient_name = ? AND medication_name = ? AND (end_date IS NULL OR end_date >= ?)
+        """, (start_date,) + pair + (start_date,))
+        conn.executemany("""
+            INSERT INTO medication_schedules (patient_name, medication_name, dose_time, dose_amount, dose_unit,
+                                              start_date, end_date, window_minutes, late_minutes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [pair + (dose_time, amount, unit, start_date, end_date, window_minutes, late_minutes)
+              for dose_time in dose_times])
+        rebuild_adherence(conn, patient_name, medication_name)
+
+
+# Every scheduled dose due from start to end, optionally for one patient,
+# oldest first, with its status: on time, late, missed or pending
+def doses_due(cursor, start, end, patient_name=None, now=None):
+    where = "WHERE s.patient_name = :patient_name" if patient_name is not None else ""
+    cursor.execute(_DOSES_DUE.format(where=where) + " ORDER BY scheduled.due, scheduled.medication_name",
+                   _range(start, end, now, patient_name=patient_name))
+    return pd.DataFrame(cursor.fetchall(), columns=DOSE_COLUMNS)
+
+
+# Adherence of every patient and medication from start to end, worst first:
+# doses scheduled (not counting pending ones), taken on time, late, missed,
+# the share taken at all, and how late the late ones were on average
+def adherence_report(cursor, start, end, now=None):
+    cursor.execute(f"""
+        SELECT patient_name, medication_name, sum(status != 'pending') AS scheduled,
+               sum(status = 'on time'), sum(status = 'late'), sum(status = 'missed'),
+               round(100.0 * sum(status IN ('on time', 'late')) / nullif(sum(status != 'pending'), 0), 1)
+                   AS adherence,
+               round(avg(CASE WHEN status = 'late' THEN minutes_late END))
+        FROM ({_DOSES_DUE.format(where="")})
+        GROUP BY patient_name, medication_name
+        HAVING scheduled > 0
+        ORDER BY adherence, patient_name, medication_name
+    """, _range(start, end, now))
+    return pd.DataFrame(cursor.fetchall(), columns=REPORT_COLUMNS)
+
+
+# Doses logged and total amount per day, medication and unit for a patient,
+# from the medication_daily rollup; start and end are dates, end exclusive
+def daily_totals(cursor, patient_name, start, end):
+    cursor.execute("""
+        SELECT day, medication_name, dose_unit, doses, total_amount FROM medication_daily
+        WHERE patient_name = ? AND day >= ? AND day < ?
+        ORDER BY day, medication_name
+    """, (patient_name, str(start), str(end)))
+    return pd.DataFrame(cursor.fetchall(), columns=DAILY_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report medication adherence for every scheduled patient")
+    parser.add_argument("--days", type=int, default=7, help="Days to report on, ending today")
+    parser.add_argument("--patient", help="List one patient's scheduled doses instead")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Re-match every logged dose to the schedules first, e.g. after editing them by hand")
+    args = parser.parse_args()
+    conn = connect()
+    init_db(conn)
+    if args.rebuild:
+        with conn:
+            rebuild_adherence(conn)
+    end = datetime.now(timezone.utc).date() + timedelta(days=1)
+    start = end - timedelta(days=args.days)
+    cursor = conn.cursor()
+    if args.patient:
+        report = doses_due(cursor, start, end, args.patient)
+    else:
+        report = adherence_report(cursor, start, end)
+    if report.empty:
+        print("No scheduled doses in that range.")
+    else:
+        print(report.to_string(index=False))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import numpy as np
+import pandas as pd
+from db import connect, init_db
+
+RULE_COLUMNS = ["id", "patient_name", "age_min", "age_max", "metric", "kind", "low", "high",
+                "window_minutes", "abnormal_type"]
+READING_COLUMNS = ["name", "age", "heart_rate", "systolic", "diastolic", "timestamp"]
+METRICS = ["heart_rate", "systolic", "diastolic"]
+# How each metric reads in a notification
+LABELS = {"heart_rate": ("Heart Rate", "bpm"), "systolic": ("Systolic", "mmHg"), "diastolic": ("Diastolic", "mmHg")}
+
+
+# Load the enabled alert rules from the vital_rules table
+def load_rules(cursor):
+    cursor.execute(f"SELECT {', '.join(RULE_COLUMNS)} FROM vital_rules WHERE enabled ORDER BY id")
+    return pd.DataFrame(cursor.fetchall(), columns=RULE_COLUMNS)
+
+
+# Rows within a rule's age band; a rule without one covers every age
+def _in_band(ages, rule):
+    mask = np.ones(len(ages), dtype=bool)
+    if pd.notna(rule.age_min):
+        mask &= ages >= rule.age_min
+    if pd.notna(rule.age_max):
+        mask &= ages <= rule.age_max
+    return mask
+
+
+# Rows a rule applies to. For each metric and kind the most specific rule
+# wins: a patient-specific rule replaces the others for that patient, and an
+# age-band rule replaces the general rules for the ages it covers, so a band
+# can relax the default thresholds as well as tighten them.
+def _applies(readings, rules, rule):
+    names = readings["name"]
+    ages = readings["age"].to_numpy()
+    mask = _in_band(ages, rule)
+    if pd.notna(rule.patient_name):
+        return mask & (names == rule.patient_name).to_numpy()
+    same = rules[(rules["metric"] == rule.metric) & (rules["kind"] == rule.kind)]
+    mask &= ~names.isin(same.loc[same["patient_name"].notna(), "patient_name"]).to_numpy()
+    if pd.isna(rule.age_min) and pd.isna(rule.age_max):
+        bands = same[same["patient_name"].isna() & (same["age_min"].notna() | same["age_max"].notna())]
+        for band in bands.itertuples(index=False):
+            mask &= ~_in_band(ages, band)
+    return mask
+
+
+# True where values fall outside [low, high]; missing values never do
+def _outside(values, low, high):
+    mask = np.zeros(len(values), dtype=bool)
+    if pd.notna(low):
+        mask |= values < low
+    if pd.notna(high):
+        mask |= values > high
+    return mask
+
+
+def _as_text(values):
+    return pd.Series(values).round().astype("int64").astype(str).to_numpy()
+
+
+# Check every reading against every rule in one vectorized pass per rule.
+# readings needs READING_COLUMNS; rate rules compare each reading with the
+# same patient's previous one in readings. Returns one row per violation:
+# the reading's index label, the rule id, abnormal_type and abnormal_data.
+def score(readings, rules):
+    violations = []
+    if readings.empty or rules.empty:
+        return pd.DataFrame(columns=["reading", "rule_id", "abnormal_type", "abnormal_data"])
+    timestamps = pd.to_datetime(readings["timestamp"])
+    values = {metric: readings[metric].to_numpy(dtype="float64") for metric in METRICS}
+
+    previous = None
+    if (rules["kind"] == "rate").any():
+        ordered = readings[["name"] + METRICS].assign(timestamp=timestamps)
+        ordered = ordered.sort_values(["name", "timestamp"], kind="stable")
+        previous = ordered.groupby("name", sort=False)[METRICS + ["timestamp"]].shift(1).reindex(readings.index)
+        minutes = ((timestamps - previous["timestamp"]).dt.total_seconds() / 60).to_numpy()
+
+    for rule in rules.itertuples(index=False):
+        applies = _applies(readings, rules, rule)
+        current = values[rule.metric]
+        label, unit = LABELS[rule.metric]
+        if rule.kind == "rate":
+            change = current - previous[rule.metric].to_numpy(dtype="float64")
+            recent = minutes <= (rule.window_minutes if pd.notna(rule.window_minutes) else np.inf)
+            hits = np.flatnonzero(applies & recent & _outside(change, rule.low, rule.high))
+            signs = np.where(change[hits] >= 0, "+", "-")
+            data = (f"{label} change: " + signs + _as_text(np.abs(change[hits]))
+                    + f" {unit} in " + _as_text(minutes[hits]) + " min")
+        else:
+            hits = np.flatnonzero(applies & _outside(current, rule.low, rule.high))
+            if rule.metric == "heart_rate":
+                data = f"{label}: " + _as_text(current[hits]) + f" {unit}"
+            else:
+                data = ("Blood Pressure: " + _as_text(values["systolic"][hits]) + "/"
+                        + _as_text(values["diastolic"][hits]) + " mmHg")
+        violations.append(pd.DataFrame({
+            "reading": readings.index[hits],
+            "rule_id": rule.id,
+            "abnormal_type": rule.abnormal_type,
+            "abnormal_data": data,
+        }))
+    return pd.concat(violations, ignore_index=True)
+
+
+# Notification rows (name, abnormal_data, abnormal_type, timestamp) for a
+# scored batch; a reading that breaks two rules with the same message (say
+# systolic and diastolic) produces one notification
+def notification_rows(readings, violations):
+    unique = violations.drop_duplicates(["reading", "abnormal_type", "abnormal_data"])
+    rows = readings.loc[unique["reading"], ["name", "timestamp"]]
+    return list(zip(rows["name"].tolist(), unique["abnormal_data"].tolist(), unique["abnormal_type"].tolist(),
+                    rows["timestamp"].tolist()))
+
+
+def write_notifications(conn, rows):
+    conn.executemany("""
+        INSERT INTO notifications (name, abnormal_data, abnormal_type, timestamp)
+        VALUES (?, ?, ?, ?)
+    """, rows)
+
+
+# Re-screen stored vitals, optionally only from `since` on, against the
+# current rules. Rows are streamed in (name, timestamp) order in chunks; each
+# chunk carries the previous chunk's last reading along so rate rules see it.
+# Returns the number of violations per abnormal type.
+def rescreen(conn, since=None, write=False, chunk_size=200_000):
+    rules = load_rules(conn.cursor())
+    cursor = conn.cursor()
+    where = "WHERE timestamp >= ?" if since else ""
+    cursor.execute(f"""
+        SELECT {', '.join(READING_COLUMNS)} FROM medical_data {where}
+        ORDER BY name, timestamp
+    """, (since,) if since else ())
+    counts = pd.Series(dtype="int64")
+    carry = None
+    while True:
+        records = cursor.fetchmany(chunk_size)
+        if not records:
+            break
+        chunk = pd.DataFrame(records, columns=READING_COLUMNS)
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        violations = score(chunk, rules)
+        if carry is not None:
+            violations = violations[violations["reading"] != 0]
+        counts = counts.add(violations["abnormal_type"].value_counts(), fill_value=0)
+        if write and not violations.empty:
+            with conn:
+                write_notifications(conn, notification_rows(chunk, violations))
+        carry = chunk.iloc[[-1]]
+    return counts.astype("int64")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-screen stored vitals against the current alert rules")
+    parser.add_argument("--since", help="Only readings from this date on (YYYY-MM-DD)")
+    parser.add_argument("--write", action="store_true", help="Insert a notification for every violation found")
+    args = parser.parse_args()
+    conn = connect()
+    init_db(conn)
+    counts = rescreen(conn, since=args.since, write=args.write)
+    if counts.empty:
+        print("No abnormal readings found.")
+    for abnormal_type, count in counts.items():
+        print(f"{abnormal_type}: {count}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
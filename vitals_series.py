@@ -0,0 +1,158 @@
+import threading
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["ID", "Timestamp", "Heart Rate", "Systolic", "Diastolic"]
+
+
+# A patient's readings with start <= timestamp < end (either bound may be
+# None), kept in memory and extended incrementally. The first refresh()
+# loads just that range through the (name, timestamp) index; later ones only
+# fetch rows with an id above the largest one seen then, through the
+# (name, id) index, and only those new rows go through pd.to_datetime. Safe
+# to share between sessions.
+class VitalsSeries:
+    def __init__(self, name, start=None, end=None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.max_id = None
+        self.df = pd.DataFrame({
+            "ID": pd.Series(dtype="int64"),
+            "Timestamp": pd.Series(dtype="datetime64[ns]"),
+            "Heart Rate": pd.Series(dtype="int64"),
+            "Systolic": pd.Series(dtype="float64"),
+            "Diastolic": pd.Series(dtype="float64"),
+        })
+        self._lock = threading.Lock()
+
+    def _load(self, cursor):
+        cursor.execute("SELECT coalesce(max(id), 0) FROM medical_data WHERE name = ?", (self.name,))
+        self.max_id = cursor.fetchone()[0]
+        conditions, params = ["name = ?", "id <= ?"], [self.name, self.max_id]
+        if self.start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(str(self.start))
+        if self.end is not None:
+            conditions.append("timestamp < ?")
+            params.append(str(self.end))
+        cursor.execute(f"""
+            SELECT id, timestamp, heart_rate, systolic, diastolic FROM medical_data
+            WHERE {' AND '.join(conditions)}
+            ORDER BY timestamp
+        """, params)
+        return cursor.fetchall()
+
+    # Rows added since the last refresh, kept only if they fall in the range;
+    # max_id moves past the others too, so they aren't fetched again
+    def _fetch_new(self, cursor):
+        cursor.execute("""
+            SELECT id, timestamp, heart_rate, systolic, diastolic FROM medical_data
+            WHERE name = ? AND id > ?
+            ORDER BY id
+        """, (self.name, self.max_id))
+        records = cursor.fetchall()
+        if records:
+            self.max_id = records[-1][0]
+        start = None if self.start is None else str(self.start)
+        end = None if self.end is None else str(self.end)
+        return [record for record in records
+                if (start is None or record[1] >= start) and (end is None or record[1] < end)]
+
+    # Load the range, or append rows added to it since the last refresh;
+    # returns the full, time-sorted frame
+    def refresh(self, cursor):
+        with self._lock:
+            records = self._load(cursor) if self.max_id is None else self._fetch_new(cursor)
+            if records:
+                new = pd.DataFrame(records, columns=COLUMNS)
+                new["Timestamp"] = pd.to_datetime(new["Timestamp"])
+                new[["Systolic", "Diastolic"]] = new[["Systolic", "Diastolic"]].astype("float64")
+                # Readings normally arrive in time order; only re-sort when a
+                # backfilled reading lands before the newest one we have
+                in_order = self.df.empty or new["Timestamp"].iloc[0] >= self.df["Timestamp"].iloc[-1]
+                df = pd.concat([self.df, new], ignore_index=True)
+                if not (in_order and new["Timestamp"].is_monotonic_increasing):
+                    df = df.sort_values("Timestamp", kind="stable", ignore_index=True)
+                self.df = df
+            return self.df
+
+
+# Min/max downsampling: split the rows into equal buckets and keep, for every
+# column, the rows holding each bucket's minimum and maximum. Peaks and dips
+# survive, and the result has at most about `points` rows. Returns sorted
+# row positions.
+def downsample_indices(values, points):
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    n = len(values)
+    buckets = max(points // (2 * values.shape[1]), 1)
+    if n <= points or n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full((buckets * size, values.shape[1]), np.nan)
+    padded[:n] = values
+    padded = padded.reshape(buckets, size, values.shape[1])
+    # Padding and missing readings never win a bucket's min or max
+    lows = np.where(np.isnan(padded), np.inf, padded).argmin(axis=1)
+    highs = np.where(np.isnan(padded), -np.inf, padded).argmax(axis=1)
+    starts = (np.arange(buckets) * size)[:, None]
+    picks = np.concatenate([starts + lows, starts + highs]).ravel()
+    # Always keep the first and last reading so the x-axis spans the range
+    picks = np.concatenate([picks, [0, n - 1]])
+    return np.unique(picks[picks < n])
+
+
+def downsample(df, columns, points):
+    return df.iloc[downsample_indices(df[columns].to_numpy(), points)]
+
+
+# Longest time ranges charted from raw readings and from hourly rollups;
+# anything longer is charted from daily rollups
+RAW_RANGE = pd.Timedelta(days=3)
+HOURLY_RANGE = pd.Timedelta(days=60)
+ROLLUP_TABLES = {"hourly": "vitals_hourly", "daily": "vitals_daily"}
+ROLLUP_COLUMNS = {"heart_rate": "Heart Rate", "systolic": "Systolic", "diastolic": "Diastolic"}
+
+
+# "raw", "hourly" or "daily", whichever suits charting a patient's vitals
+# between start and end (either may be None, meaning the ends of their history)
+def chart_resolution(cursor, name, start=None, end=None):
+    if start is None or end is None:
+        cursor.execute("SELECT min(bucket), max(bucket) FROM vitals_daily WHERE name = ?", (name,))
+        first, last = cursor.fetchone()
+        if first is None:
+            return "raw"
+        start = first if start is None else start
+        end = pd.Timestamp(last) + pd.Timedelta(days=1) if end is None else end
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    if span <= RAW_RANGE:
+        return "raw"
+    return "hourly" if span <= HOURLY_RANGE else "daily"
+
+
+# A patient's hourly or daily rollups with start <= bucket < end, with the
+# min, mean and max of each metric and the number of readings per bucket
+def rollup(cursor, name, resolution, start=None, end=None):
+    conditions, params = ["name = ?"], [name]
+    if start is not None:
+        conditions.append("bucket >= ?")
+        params.append(str(start))
+    if end is not None:
+        conditions.append("bucket < ?")
+        params.append(str(end))
+    aggregates = ", ".join(f"{m}_min, {m}_sum, {m}_count, {m}_max" for m in ROLLUP_COLUMNS)
+    cursor.execute(f"""
+        SELECT bucket, readings, {aggregates} FROM {ROLLUP_TABLES[resolution]}
+        WHERE {' AND '.join(conditions)} ORDER BY bucket
+    """, params)
+    raw = pd.DataFrame(cursor.fetchall(), columns=["bucket", "readings"] + [
+        f"{m}_{part}" for m in ROLLUP_COLUMNS for part in ("min", "sum", "count", "max")])
+    df = pd.DataFrame({"Timestamp": pd.to_datetime(raw["bucket"]), "Readings": raw["readings"]})
+    for metric, label in ROLLUP_COLUMNS.items():
+        df[f"{label} Min"] = raw[f"{metric}_min"].astype("float64")
+        # A bucket with no values for a metric has a count of 0 and a NaN mean
+        df[f"{label} Mean"] = raw[f"{metric}_sum"] / raw[f"{metric}_count"].where(raw[f"{metric}_count"] > 0)
+        df[f"{label} Max"] = raw[f"{metric}_max"].astype("float64")
+    return df